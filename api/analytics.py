@@ -0,0 +1,176 @@
+from datetime import date, datetime, time, timedelta
+
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Category, Transaction
+
+try:
+    import numpy as np
+except ImportError:  # optional; the analytics endpoint reports itself unavailable
+    np = None
+
+
+DEFAULT_WINDOW = 7
+MAX_DAYS = 3660
+PERCENTILES = (50, 90, 99)
+
+
+def available():
+    return np is not None
+
+
+def default_period():
+    """The last twelve calendar months including the current one, as inclusive dates"""
+    today = timezone.localdate()
+    first = today.replace(day=1)
+    for _ in range(11):
+        first = (first - timedelta(days=1)).replace(day=1)
+    return first, today
+
+
+def load_columns(user, date_from, date_to, category_id=None):
+    """
+    Pull (local day, category id, amount, is_income) for the user's
+    transactions between two inclusive dates into NumPy arrays. The range
+    is applied on the raw datetime so the (user, date) index is used.
+    """
+    tz = timezone.get_current_timezone()
+    queryset = Transaction.objects.filter(user=user, date__gte=datetime.combine(date_from, time.min, tzinfo=tz))
+    # date.max has no next day; nothing can lie after it anyway
+    if date_to < date.max:
+        queryset = queryset.filter(date__lt=datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=tz))
+    if category_id is not None:
+        queryset = queryset.filter(category_id=category_id)
+    rows = list(queryset.annotate(day=TruncDate('date')).values_list('day', 'category_id', 'amount', 'is_income'))
+
+    if not rows:
+        return {
+            'day': np.array([], dtype='datetime64[D]'),
+            'category': np.array([], dtype=np.int64),
+            'amount': np.array([], dtype=np.int64),
+            'is_income': np.array([], dtype=bool),
+        }
+    days, categories, amounts, incomes = zip(*rows)
+    return {
+        'day': np.array(days, dtype='datetime64[D]'),
+        # Uncategorised transactions get category 0, which no row uses
+        'category': np.array([c or 0 for c in categories], dtype=np.int64),
+        'amount': np.array(amounts, dtype=np.int64),
+        'is_income': np.array(incomes, dtype=bool),
+    }
+
+
+def _split_sums(index, length, amount, is_income):
+    """Income and expense sums per bucket index, in two bincounts"""
+    income = np.bincount(index, weights=np.where(is_income, amount, 0), minlength=length)
+    expenses = np.bincount(index, weights=np.where(is_income, 0, amount), minlength=length)
+    return income.astype(np.int64), expenses.astype(np.int64)
+
+
+def rolling_mean(series, window):
+    """Trailing mean over `window` buckets via cumulative sums; None until the window is full"""
+    if window <= 0 or len(series) < window:
+        return [None] * len(series)
+    cumulative = np.cumsum(np.concatenate(([0], series)), dtype=np.float64)
+    means = (cumulative[window:] - cumulative[:-window]) / window
+    return [None] * (window - 1) + np.round(means, 2).tolist()
+
+
+def daily_series(columns, date_from, date_to, window=DEFAULT_WINDOW):
+    start = np.datetime64(date_from, 'D')
+    length = (np.datetime64(date_to, 'D') - start).astype(np.int64) + 1
+    index = (columns['day'] - start).astype(np.int64)
+    income, expenses = _split_sums(index, length, columns['amount'], columns['is_income'])
+    return {
+        'dates': np.arange(start, start + length).astype(str).tolist(),
+        'income': income.tolist(),
+        'expenses': expenses.tolist(),
+        'net': (income - expenses).tolist(),
+        'rolling_expenses': rolling_mean(expenses, window),
+    }
+
+
+def weekly_series(columns, date_from, date_to):
+    """Totals per ISO week, labelled by the Monday it starts on"""
+    def monday(days):
+        # 1970-01-01 was a Thursday
+        return days - (days.astype(np.int64) + 3) % 7
+
+    start = monday(np.datetime64(date_from, 'D'))
+    length = (monday(np.datetime64(date_to, 'D')) - start).astype(np.int64) // 7 + 1
+    index = (monday(columns['day']) - start).astype(np.int64) // 7
+    income, expenses = _split_sums(index, length, columns['amount'], columns['is_income'])
+    return {
+        'weeks': (start + 7 * np.arange(length)).astype(str).tolist(),
+        'income': income.tolist(),
+        'expenses': expenses.tolist(),
+    }
+
+
+def monthly_series(columns, date_from, date_to):
+    """Totals per calendar month with month-over-month expense changes"""
+    start = np.datetime64(date_from, 'M')
+    length = (np.datetime64(date_to, 'M') - start).astype(np.int64) + 1
+    index = (columns['day'].astype('datetime64[M]') - start).astype(np.int64)
+    income, expenses = _split_sums(index, length, columns['amount'], columns['is_income'])
+
+    change = np.diff(expenses)
+    previous = expenses[:-1].astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_pct = np.where(previous > 0, np.round(change / previous * 100, 2), np.nan)
+    return {
+        'months': np.arange(start, start + length).astype(str).tolist(),
+        'income': income.tolist(),
+        'expenses': expenses.tolist(),
+        'expense_change': [None] + change.tolist(),
+        'expense_change_pct': [None] + [None if np.isnan(value) else value for value in change_pct.tolist()],
+    }
+
+
+def category_stats(columns, user):
+    """Count, total, mean and percentiles of expense amounts per category, largest total first"""
+    expense = ~columns['is_income']
+    categories = columns['category'][expense]
+    amounts = columns['amount'][expense]
+    if not len(amounts):
+        return []
+
+    # Sort by category, then amount, so every category is one sorted slice
+    order = np.lexsort((amounts, categories))
+    categories = categories[order]
+    amounts = amounts[order]
+    ids, starts, counts = np.unique(categories, return_index=True, return_counts=True)
+    totals = np.add.reduceat(amounts, starts)
+
+    names = dict(Category.objects.filter(user=user, id__in=ids.tolist()).values_list('id', 'name'))
+    stats = []
+    for category_id, start, count, total in zip(ids.tolist(), starts.tolist(), counts.tolist(), totals.tolist()):
+        values = amounts[start:start + count]
+        percentiles = np.percentile(values, PERCENTILES)
+        stats.append({
+            'category': category_id or None,
+            'category_name': names.get(category_id, "No category"),
+            'count': count,
+            'total': total,
+            'mean': round(total / count, 2),
+            **{f'p{p}': round(float(value), 2) for p, value in zip(PERCENTILES, percentiles)},
+        })
+    stats.sort(key=lambda row: -row['total'])
+    return stats
+
+
+def analyze(user, date_from, date_to, category_id=None, window=DEFAULT_WINDOW):
+    """Every series and statistic for the period from one bulk load"""
+    return compute(user, load_columns(user, date_from, date_to, category_id), date_from, date_to, window)
+
+
+def compute(user, columns, date_from, date_to, window=DEFAULT_WINDOW):
+    return {
+        'period': {'date_from': date_from, 'date_to': date_to},
+        'transactions': len(columns['amount']),
+        'daily': daily_series(columns, date_from, date_to, window),
+        'weekly': weekly_series(columns, date_from, date_to),
+        'monthly': monthly_series(columns, date_from, date_to),
+        'categories': category_stats(columns, user),
+    }
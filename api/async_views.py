@@ -0,0 +1,149 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from . import fast_json, response_cache, views
+from .authentication import CustomJWTAuthentication
+from .models import Category, Person, SavingsGoal, Transaction
+from .periods import month_range
+
+
+CATEGORY_FIELDS = ('id', 'name', 'description', 'user_id')
+ACCOUNT_FIELDS = ('id', 'username', 'name', 'income', 'birthday', 'is_premium')
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(fast_json.FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+async def fetch(queryset):
+    """Evaluate a queryset through the async ORM"""
+    return [row async for row in queryset]
+
+
+async def authenticate(request):
+    """(user, None) for a valid bearer token, otherwise (None, error response) like the sync views"""
+    try:
+        auth_result = await CustomJWTAuthentication().aauthenticate(request)
+    except (InvalidToken, TokenError) as e:
+        return None, json_response({'error': f'Invalid token: {str(e)}'}, status.HTTP_401_UNAUTHORIZED)
+    if auth_result is None:
+        return None, json_response(
+            {'error': 'Authentication credentials were not provided'}, status.HTTP_401_UNAUTHORIZED
+        )
+    return auth_result[0], None
+
+
+@require_GET
+async def account_view(request):
+    """GET of views.account_view"""
+    user, error = await authenticate(request)
+    if error:
+        return error
+    account = {field: getattr(user, field) for field in ACCOUNT_FIELDS}
+    return json_response(account)
+
+
+@require_GET
+async def dashboard_view(request):
+    """views.dashboard_view with the sections awaited together"""
+    user, error = await authenticate(request)
+    if error:
+        return error
+    try:
+        start, end = views.dashboard_month(request)
+    except ValueError:
+        return json_response({"error": "Invalid date parameter"}, 400)
+
+    # The ORM is sync underneath: every section still runs on the one
+    # thread-sensitive executor and its connection, interleaved with other requests
+    sections = views.dashboard_sections(user, start, end)
+    results = await asyncio.gather(*(sync_to_async(build)() for build in sections.values()))
+    return json_response(dict(zip(sections, results)))
+
+
+@require_GET
+async def transaction_list(request):
+    """
+    The full-list mode of views.transaction_list (date/year month filter).
+    Cursor pages and streams are only served by the sync view.
+    """
+    user_id = request.GET.get('user_id')
+    if not user_id:
+        return json_response({"error": "user_id is required"}, 400)
+    if any(param in request.GET for param in ('cursor', 'page_size', 'stream')):
+        return json_response({"error": "Use /api/transactions/ for cursor and stream modes"}, 400)
+    return await response_cache.acached(
+        request, user_id, response_cache.TRANSACTIONS, lambda: list_transactions(request, user_id)
+    )
+
+
+async def list_transactions(request, user_id):
+    month_index = request.GET.get('date')
+    year = request.GET.get('year')
+    transactions = Transaction.objects.filter(user_id=user_id)
+    if month_index is not None:
+        try:
+            year = int(year) if year else timezone.localtime().year
+            month_start, month_end = month_range(year, int(month_index) + 1)
+        except ValueError:
+            return json_response({"error": "Invalid date parameter"}, 400)
+        transactions = transactions.filter(date__gte=month_start, date__lt=month_end)
+
+    # The owner check and the rows don't depend on each other
+    exists, values = await asyncio.gather(
+        Person.objects.filter(id=user_id).aexists(),
+        fetch(transactions.order_by('-date').values_list(*fast_json.lookups(fast_json.TRANSACTION_FIELDS))),
+    )
+    if not exists:
+        return json_response({"error": "User not found"}, 404)
+    return json_response(fast_json.build_transaction_rows(values))
+
+
+@require_GET
+async def get_categories(request):
+    """views.GetCategoriesView"""
+    user_id = request.GET.get('user_id')
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return json_response({"error": "user_id is required"}, 400)
+    return await response_cache.acached(
+        request, user_id, response_cache.CATEGORIES, lambda: list_categories(user_id)
+    )
+
+
+async def list_categories(user_id):
+    exists, categories = await asyncio.gather(
+        Person.objects.filter(id=user_id).aexists(),
+        fetch(Category.objects.filter(user_id=user_id).values(*CATEGORY_FIELDS)),
+    )
+    if not exists:
+        return json_response({"error": "User not found"}, 404)
+    return json_response(categories)
+
+
+@require_GET
+async def savings_goal_list(request):
+    """GET of views.savings_goal_list"""
+    user, error = await authenticate(request)
+    if error:
+        return error
+    if not user.is_premium:
+        return json_response(
+            {'error': 'Savings goals are only available for premium users'}, status.HTTP_403_FORBIDDEN
+        )
+    return await response_cache.acached(
+        request, user.id, response_cache.SAVINGS_GOALS, lambda: list_savings_goals(user)
+    )
+
+
+async def list_savings_goals(user):
+    goals = SavingsGoal.objects.filter(user=user).order_by('-created_at')
+    values = await fetch(goals.values_list(*fast_json.lookups(fast_json.SAVINGS_GOAL_FIELDS)))
+    return json_response(fast_json.build_savings_goal_rows(values))
@@ -1,7 +1,9 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth.models import AnonymousUser
+from . import claims
 from .models import Person
+from .user_cache import person_cache
 import jwt
 from django.conf import settings
 
@@ -19,7 +21,8 @@ class CustomJWTAuthentication(JWTAuthentication):
             if user_id is None:
                 return None
             
-            user = Person.objects.get(id=user_id)
+            # Served from the Person cache; misses fall through to the database
+            user = person_cache.get(user_id)
             return user
         except Person.DoesNotExist:
             return None
@@ -52,4 +55,49 @@ class CustomJWTAuthentication(JWTAuthentication):
         if user is None:
             return None
         
-        return (user, validated_token)
\ No newline at end of file
+        return (user, validated_token)
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views: the token is checked in place and
+        the Person comes from PersonCache.aget.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        user_id = validated_token.get('user_id')
+        if user_id is None:
+            return None
+        try:
+            user = await person_cache.aget(user_id)
+        except Person.DoesNotExist:
+            return None
+        return (user, validated_token)
+
+
+class ClaimsJWTAuthentication(CustomJWTAuthentication):
+    """
+    For views that only need the user's id, name and premium flag. With the
+    CLAIMS_USER mode on, a token whose claims match the current Person
+    version gives a user built from the token; any other token falls back to
+    loading the Person. A token whose claims are stale reads the row itself,
+    since the cached Person may predate the same change.
+    """
+
+    def get_user(self, validated_token):
+        if claims.enabled():
+            user = claims.user_from_claims(validated_token)
+            if user is not None:
+                return user
+            if 'ver' in validated_token:
+                try:
+                    return Person.objects.get(pk=validated_token.get('user_id'))
+                except Person.DoesNotExist:
+                    return None
+        return super().get_user(validated_token)
@@ -0,0 +1,159 @@
+import random
+from contextlib import contextmanager
+from itertools import islice
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+
+from . import rollups
+from .models import RESERVED_USERNAME_PREFIX, Category, CategoryLimit, Person, SavingsGoal, Transaction
+
+
+# Registration refuses the reserved prefix, so only generated users carry it
+PREFIX = RESERVED_USERNAME_PREFIX + 'bench_'
+# .invalid can never be a real address, so generated emails don't collide either
+EMAIL_DOMAIN = 'bench.invalid'
+PASSWORD = 'bench-password'
+
+WORDS = [
+    'grocery', 'salary', 'rent', 'coffee', 'lunch', 'dinner', 'fuel', 'parking', 'cinema',
+    'pharmacy', 'insurance', 'internet', 'phone', 'gym', 'books', 'clothes', 'gift', 'taxi',
+    'train', 'flight', 'hotel', 'electricity', 'water', 'heating', 'bakery', 'market', 'bonus',
+]
+
+DEFAULT_SCALE = {
+    'users': 50,
+    'categories': 8,                 # per user
+    'transactions': 400,             # per user, spread over `months`
+    'months': 12,
+    'premium_share': 0.5,
+    'goals': 2,                      # per premium user
+    'limits': 4,                     # per premium user
+}
+
+
+class NotABenchDatabase(Exception):
+    """The database isn't marked for benchmarks and force wasn't given"""
+
+
+def check_database(force=False):
+    """
+    Benchmarks fill the database with generated users and delete every
+    user whose name starts with PREFIX, so they only run on a database
+    marked with BENCHMARK_DATABASE or when forced.
+    """
+    if not (force or getattr(settings, 'BENCHMARK_DATABASE', False)):
+        raise NotABenchDatabase(
+            f"Database {connection.settings_dict['NAME']} is not marked as a benchmark database "
+            f"where {PREFIX}* users are created and deleted; set BENCH_DATABASE=1 for a dedicated one or use --force"
+        )
+
+
+@contextmanager
+def backdating():
+    """Let bulk_create write explicit Transaction.date values"""
+    field = Transaction._meta.get_field('date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def clear(force=False):
+    """Delete every generated user; their rows cascade"""
+    check_database(force)
+    Person.objects.filter(username__startswith=PREFIX).delete()
+
+
+def create_user(name, force=False, **fields):
+    """
+    A fresh generated user for a single-user benchmark, replacing the one a
+    crashed run left behind. Delete it when done.
+    """
+    check_database(force)
+    username = f'{PREFIX}{name}'
+    Person.objects.filter(username=username).delete()
+    return Person.objects.create(
+        username=username, name='Benchmark', email=f'{name}@{EMAIL_DOMAIN}', password='!', **fields
+    )
+
+
+def create_transactions(transactions, batch_size=5000):
+    """bulk_create an iterable of unsaved Transactions batch_size at a time"""
+    transactions = iter(transactions)
+    while batch := list(islice(transactions, batch_size)):
+        Transaction.objects.bulk_create(batch)
+
+
+def generate(scale=None, seed=0, batch_size=5000, force=False):
+    """
+    Create a reproducible data set of users with categories, transactions
+    over the last `months` months, and goals and limits for premium users.
+    Every user's password is PASSWORD (hashed once). Returns the user ids.
+    """
+    scale = {**DEFAULT_SCALE, **(scale or {})}
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+    now = timezone.now()
+    clear(force)
+
+    usernames = [f'{PREFIX}{i:05d}' for i in range(scale['users'])]
+    with db_transaction.atomic():
+        Person.objects.bulk_create(
+            Person(
+                username=username, name=f'Bench User {i}', email=f'{i}@{EMAIL_DOMAIN}',
+                password=password, income=rng.randint(200_000, 900_000),
+                is_premium=rng.random() < scale['premium_share'],
+            )
+            for i, username in enumerate(usernames)
+        )
+        users = list(Person.objects.filter(username__in=usernames).order_by('id'))
+        Category.objects.bulk_create(
+            Category(name=f'Category {i}', user=user)
+            for user in users for i in range(scale['categories'])
+        )
+        categories = {}
+        for category in Category.objects.filter(user__in=users).order_by('id'):
+            categories.setdefault(category.user_id, []).append(category)
+
+        span_seconds = int(timedelta(days=30 * scale['months']).total_seconds())
+
+        def transactions():
+            for user in users:
+                for _ in range(scale['transactions']):
+                    is_income = rng.random() < 0.1
+                    yield Transaction(
+                        user=user,
+                        category=None if rng.random() < 0.05 else rng.choice(categories[user.id]),
+                        amount=rng.randint(10_000, 200_000) if is_income else rng.randint(100, 8_000),
+                        description=' '.join(rng.sample(WORDS, 3)),
+                        is_income=is_income,
+                        date=now - timedelta(seconds=rng.randint(0, span_seconds)),
+                    )
+
+        with backdating():
+            create_transactions(transactions(), batch_size)
+
+        goals = []
+        limits = []
+        for user in users:
+            if not user.is_premium:
+                continue
+            for i in range(scale['goals']):
+                goals.append(SavingsGoal(
+                    user=user, name=f'Goal {i}', target_amount=rng.randint(100_000, 2_000_000),
+                    monthly_contribution=rng.randint(5_000, 50_000), category=categories[user.id][i],
+                ))
+            for category in categories[user.id][:scale['limits']]:
+                limits.append(CategoryLimit(user=user, category=category, limit_amount=rng.randint(20_000, 300_000)))
+        SavingsGoal.objects.bulk_create(goals)
+        CategoryLimit.objects.bulk_create(limits)
+
+    # bulk_create skips the signals that maintain the rollup and ledgers
+    for user in users:
+        rollups.rebuild(user)
+    return [user.id for user in users]
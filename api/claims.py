@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.db import router
+from django.db.models import F
+
+from .models import Person
+from .response_cache import shared_cache
+
+
+DEFAULTS = {
+    'ENABLED': False,          # sign account claims into tokens at login and trust them
+    'CACHE_ALIAS': 'default',  # Django cache holding the current version per user
+    'VERSION_TTL': 300,        # seconds a cached version lives; bumps delete it right away
+    'ALLOW_PROCESS_LOCAL': False,  # cache versions in a per-process backend (single process only)
+}
+
+# Token claim -> Person field carried in "claims user" tokens
+CLAIM_FIELDS = {'name': 'name', 'is_premium': 'is_premium', 'ver': 'version'}
+# Person fields a claims user takes from the token, which may be older than the row
+TOKEN_FIELDS = ('username', 'name', 'is_premium')
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'CLAIMS_USER', {})}
+
+
+def enabled():
+    return config()['ENABLED']
+
+
+def _cache():
+    # Without a shared cache every check reads the version from the row
+    options = config()
+    return shared_cache(options['CACHE_ALIAS'], options['ALLOW_PROCESS_LOCAL'])
+
+
+def _version_key(user_id):
+    return f'claims:version:{user_id}'
+
+
+def add_claims(token, user):
+    """Sign the account fields the premium views need into a token"""
+    for claim, field in CLAIM_FIELDS.items():
+        token[claim] = getattr(user, field)
+
+
+def current_version(user_id):
+    """The Person row version, from the cache when possible"""
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key) if cache is not None else None
+    if version is None:
+        version = Person.objects.filter(pk=user_id).values_list('version', flat=True).first()
+        if version is not None and cache is not None:
+            cache.add(key, version, config()['VERSION_TTL'])
+    return version
+
+
+def bump(user_id):
+    """Move the row to a new version; tokens signed before it stop being trusted"""
+    Person.objects.filter(pk=user_id).update(version=F('version') + 1)
+    forget(user_id)
+
+
+def forget(user_id):
+    cache = _cache()
+    if cache is not None:
+        cache.delete(_version_key(user_id))
+
+
+def user_from_claims(validated_token):
+    """
+    A Person built from the token alone when its claims are current, else
+    None. Only id, username, name and is_premium are loaded; reading any
+    other field fetches it from the database. save() writes neither the
+    fields taken from the token nor the ones never loaded.
+    """
+    user_id = validated_token.get('user_id')
+    if user_id is None or any(claim not in validated_token for claim in CLAIM_FIELDS):
+        return None
+    if current_version(user_id) != validated_token['ver']:
+        return None
+    user = Person.from_db(
+        router.db_for_read(Person),
+        ['id', 'username', 'name', 'is_premium', 'version'],
+        [
+            user_id, validated_token.get('username'), validated_token['name'],
+            validated_token['is_premium'], validated_token['ver'],
+        ],
+    )
+    user._token_fields = TOKEN_FIELDS
+    return user
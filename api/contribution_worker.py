@@ -0,0 +1,20 @@
+"""
+Entry points for contribution worker threads and processes. Kept free of
+model imports so spawned processes can set Django up before loading them.
+"""
+import django
+from django.db import connections
+
+
+def run_shard_in_thread(**kwargs):
+    from . import contributions
+    try:
+        return contributions.run_shard(**kwargs)
+    finally:
+        # Each thread opened its own connection, don't leave it behind
+        connections.close_all()
+
+
+def run_shard_in_process(kwargs):
+    django.setup()
+    return run_shard_in_thread(**kwargs)
@@ -0,0 +1,190 @@
+import time
+from collections import defaultdict
+
+from django.db import transaction as db_transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from . import response_cache, rollups
+from .models import MonthlyCategoryTotal, Person, SavingsGoal, Transaction
+
+
+def active_goals():
+    """Active savings goals that have not reached their target yet"""
+    return SavingsGoal.objects.filter(status='active', current_amount__lt=F('target_amount'))
+
+
+def due_goals(today=None):
+    """Active goals that have not received this month's contribution"""
+    today = today or timezone.localdate()
+    month_start = today.replace(day=1)
+    return active_goals().filter(
+        Q(last_contribution_date__isnull=True) | Q(last_contribution_date__lt=month_start)
+    )
+
+
+def is_due(goal, today):
+    return not (
+        goal.last_contribution_date and
+        goal.last_contribution_date.month == today.month and
+        goal.last_contribution_date.year == today.year
+    )
+
+
+def balances(user_ids):
+    """Current-month balance (income + extra income - expenses) per user id, from the rollup"""
+    income = dict(Person.objects.filter(id__in=user_ids).values_list('id', 'income'))
+    totals = MonthlyCategoryTotal.objects.filter(
+        user_id__in=user_ids, month=rollups.current_month_key()
+    ).values('user_id').annotate(
+        extra_income=Sum('total', filter=Q(is_income=True)),
+        expenses=Sum('total', filter=Q(is_income=False)),
+    ).order_by()
+    result = dict(income)
+    for row in totals:
+        result[row['user_id']] += (row['extra_income'] or 0) - (row['expenses'] or 0)
+    return result
+
+
+def required_per_user(user_ids):
+    """Total monthly contribution of each user's active goals, in one grouped query"""
+    return dict(
+        active_goals().filter(user_id__in=user_ids).values('user_id').annotate(
+            total=Sum('monthly_contribution')
+        ).order_by().values_list('user_id', 'total')
+    )
+
+
+def contribute(goals, forced=False, today=None):
+    """
+    Contribute to every due goal in `goals` with one bulk_update and one
+    bulk_create. Must run inside a database transaction; returns one result
+    dict per contributed goal.
+    """
+    now = timezone.now()
+    today = today or timezone.localdate()
+    suffix = " (forced)" if forced else ""
+
+    updated = []
+    transactions = []
+    results = []
+    for goal in goals:
+        if not is_due(goal, today):
+            continue
+
+        # Calculate contribution amount (don't exceed target)
+        remaining_amount = goal.target_amount - goal.current_amount
+        contribution_amount = min(goal.monthly_contribution, remaining_amount)
+
+        goal.current_amount += contribution_amount
+        goal.last_contribution_date = today
+        goal.updated_at = now
+
+        # Mark as completed if target reached
+        if goal.current_amount >= goal.target_amount:
+            goal.status = 'completed'
+
+        updated.append(goal)
+        transactions.append(Transaction(
+            user_id=goal.user_id,
+            amount=contribution_amount,
+            description=f"Automatic contribution to savings goal: {goal.name}{suffix}",
+            is_income=False,
+            category_id=None if forced else goal.category_id,
+        ))
+        results.append({
+            'goal_id': goal.id,
+            'goal_name': goal.name,
+            'contribution_amount': contribution_amount,
+            'new_total': goal.current_amount,
+            'completed': goal.status == 'completed'
+        })
+
+    if updated:
+        SavingsGoal.objects.bulk_update(
+            updated, ['current_amount', 'last_contribution_date', 'status', 'updated_at']
+        )
+        Transaction.objects.bulk_create(transactions)
+        rollups.record_transactions(transactions)
+        # bulk_update and bulk_create skip the signals that invalidate cached responses
+        for user_id in {goal.user_id for goal in updated}:
+            invalidate_responses(user_id)
+            db_transaction.on_commit(lambda user_id=user_id: invalidate_responses(user_id))
+    return results
+
+
+def invalidate_responses(user_id):
+    response_cache.invalidate(user_id, SavingsGoal)
+    response_cache.invalidate(user_id, Transaction)
+
+
+def process_users(user_ids, forced=False, today=None, skip_locked=False):
+    """
+    Contribute for every due goal of the given users, skipping users whose
+    active goals need more than 1/3 of their balance unless forced. Locks the
+    goals it touches (with skip_locked, goals another run holds are left for
+    later); must run inside a database transaction.
+    Returns (results by user id, skipped user ids).
+    """
+    today = today or timezone.localdate()
+    goals_by_user = defaultdict(list)
+    locked_goals = due_goals(today).filter(user_id__in=user_ids).select_for_update(skip_locked=skip_locked)
+    for goal in locked_goals.order_by('id'):
+        goals_by_user[goal.user_id].append(goal)
+
+    skipped = []
+    if not forced and goals_by_user:
+        current_balances = balances(list(goals_by_user))
+        required = required_per_user(list(goals_by_user))
+        for user_id in list(goals_by_user):
+            if required.get(user_id, 0) > current_balances.get(user_id, 0) / 3:
+                skipped.append(user_id)
+                del goals_by_user[user_id]
+
+    goals = [goal for user_goals in goals_by_user.values() for goal in user_goals]
+    owners = {goal.id: goal.user_id for goal in goals}
+    results = defaultdict(list)
+    for result in contribute(goals, forced=forced, today=today):
+        results[owners[result['goal_id']]].append(result)
+    return results, skipped
+
+
+def run_shard(shard=0, shards=1, chunk_size=500, forced=False, today=None, skip_locked=False, progress=None):
+    """
+    Process every user with due goals whose id falls into this shard
+    (user_id % shards == shard), chunk by chunk, committing each chunk.
+    Users drop out of due_goals once contributed, so rerunning a shard is
+    idempotent per month and resumes after a crash. Returns the shard's totals.
+    """
+    today = today or timezone.localdate()
+    started = time.perf_counter()
+    stats = {'shard': shard, 'users': 0, 'goals': 0, 'amount': 0, 'skipped': 0}
+
+    goals = due_goals(today)
+    if shards > 1:
+        goals = goals.annotate(shard=Mod('user_id', shards)).filter(shard=shard)
+
+    # Keyset walk over the shard's users
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            goals.filter(user_id__gt=last_user_id)
+            .order_by('user_id').values_list('user_id', flat=True).distinct()[:chunk_size]
+        )
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+
+        with db_transaction.atomic():
+            results, skipped = process_users(user_ids, forced=forced, today=today, skip_locked=skip_locked)
+
+        stats['users'] += len(results)
+        stats['goals'] += sum(len(user_results) for user_results in results.values())
+        stats['amount'] += sum(r['contribution_amount'] for user_results in results.values() for r in user_results)
+        stats['skipped'] += len(skipped)
+        if progress:
+            progress(stats, last_user_id)
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,63 @@
+import threading
+import weakref
+
+from django.conf import settings
+from django.db import connections
+
+
+class ConnectionMetrics:
+    """
+    Counters for database connection reuse. With persistent connections
+    (CONN_MAX_AGE) every worker thread holds its own connection, so the
+    open connections across threads are the pool and DB_POOL_SIZE is its
+    capacity.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wrappers = weakref.WeakSet()
+        self.connections_created = 0
+        self.requests = 0
+        self.active_requests = 0
+        self.peak_active_requests = 0
+
+    def connection_created(self, wrapper):
+        with self._lock:
+            self.connections_created += 1
+            self._wrappers.add(wrapper)
+
+    def request_started(self):
+        with self._lock:
+            self.requests += 1
+            self.active_requests += 1
+            self.peak_active_requests = max(self.peak_active_requests, self.active_requests)
+
+    def request_finished(self):
+        with self._lock:
+            self.active_requests = max(self.active_requests - 1, 0)
+
+    def open_connections(self):
+        with self._lock:
+            return sum(1 for wrapper in self._wrappers if wrapper.connection is not None)
+
+    def snapshot(self):
+        pool_size = getattr(settings, 'DB_POOL_SIZE', 0)
+        open_connections = self.open_connections()
+        with self._lock:
+            return {
+                'vendor': connections['default'].vendor,
+                'conn_max_age': connections['default'].settings_dict.get('CONN_MAX_AGE'),
+                'health_checks': connections['default'].settings_dict.get('CONN_HEALTH_CHECKS'),
+                'pool_size': pool_size,
+                'open_connections': open_connections,
+                'connections_created': self.connections_created,
+                'requests': self.requests,
+                'active_requests': self.active_requests,
+                'peak_active_requests': self.peak_active_requests,
+                # Share of requests that reused an already open connection
+                'reuse_ratio': round(max(1 - self.connections_created / self.requests, 0), 4) if self.requests else 0,
+                'saturation': round(open_connections / pool_size, 4) if pool_size else None,
+            }
+
+
+connection_metrics = ConnectionMetrics()
@@ -0,0 +1,53 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = ['id', 'date', 'amount', 'is_income', 'category_id', 'category__name', 'description']
+EXPORT_HEADER = ['id', 'date', 'amount', 'is_income', 'category', 'category_name', 'description']
+
+EXPORT_TYPES = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def _rows(queryset):
+    # Plain tuples instead of model instances, fetched chunk by chunk
+    date_field = serializers.DateTimeField()
+    for row in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = list(row)
+        row[1] = date_field.to_representation(row[1])
+        yield row
+
+
+def _csv_lines(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in _rows(queryset):
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(queryset):
+    for row in _rows(queryset):
+        yield json.dumps(dict(zip(EXPORT_HEADER, row))) + '\n'
+
+
+def stream_transactions(queryset, export_type):
+    """Stream a Transaction queryset as CSV or NDJSON with constant memory use"""
+    content_type, extension = EXPORT_TYPES[export_type]
+    lines = _csv_lines(queryset) if export_type == 'csv' else _ndjson_lines(queryset)
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="transactions.{extension}"'
+    return response
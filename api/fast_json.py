@@ -0,0 +1,152 @@
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import SavingsGoal
+
+try:
+    import orjson
+except ImportError:  # optional; the renderer falls back to DRF's json encoder
+    orjson = None
+
+
+# (output key, .values() lookup) in the order the serializers emit them
+TRANSACTION_FIELDS = (
+    ('id', 'id'),
+    ('user', 'user_id'),
+    ('category', 'category_id'),
+    ('category_name', 'category__name'),
+    ('amount', 'amount'),
+    ('date', 'date'),
+    ('description', 'description'),
+    ('is_income', 'is_income'),
+)
+SAVINGS_GOAL_FIELDS = (
+    ('id', 'id'),
+    ('user', 'user_id'),
+    ('name', 'name'),
+    ('target_amount', 'target_amount'),
+    ('current_amount', 'current_amount'),
+    ('monthly_contribution', 'monthly_contribution'),
+    ('deadline', 'deadline'),
+    ('status', 'status'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('last_contribution_date', 'last_contribution_date'),
+    ('category', 'category_id'),
+)
+CATEGORY_LIMIT_FIELDS = (
+    ('id', 'id'),
+    ('user', 'user_id'),
+    ('category', 'category_id'),
+    ('category_name', 'category__name'),
+    ('limit_amount', 'limit_amount'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+
+
+def enabled():
+    return getattr(settings, 'FAST_JSON_LISTS', True)
+
+
+def _datetime_converter():
+    """
+    DRF renders datetimes in the current time zone. The database hands them
+    back in UTC, which the renderer already writes the way DRF does, so rows
+    only need converting under another time zone.
+    """
+    if timezone.get_current_timezone_name() == 'UTC':
+        return None
+
+    def convert(value):
+        if value is None:
+            return None
+        value = timezone.localtime(value).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def lookups(fields):
+    """The values_list() arguments for one of the field tables above"""
+    return [lookup for _, lookup in fields]
+
+
+def _rows(values_list, fields, datetime_fields=()):
+    keys = [key for key, _ in fields]
+    convert = _datetime_converter()
+    for values in values_list:
+        row = dict(zip(keys, values))
+        if convert:
+            for key in datetime_fields:
+                row[key] = convert(row[key])
+        yield row
+
+
+def transaction_rows(queryset):
+    """TransactionSerializer output for every row of the queryset, read with .values_list()"""
+    return build_transaction_rows(queryset.values_list(*lookups(TRANSACTION_FIELDS)))
+
+
+def build_transaction_rows(values_list):
+    """TransactionSerializer output from TRANSACTION_FIELDS value tuples"""
+    rows = []
+    for row in _rows(values_list, TRANSACTION_FIELDS, ('date',)):
+        if row['category_name'] is None:
+            row['category_name'] = "No category"
+        rows.append(row)
+    return rows
+
+
+def savings_goal_rows(queryset):
+    """SavingsGoalSerializer output, computing the progress properties from the row values"""
+    return build_savings_goal_rows(queryset.values_list(*lookups(SAVINGS_GOAL_FIELDS)))
+
+
+def build_savings_goal_rows(values_list):
+    rows = []
+    for values in _rows(values_list, SAVINGS_GOAL_FIELDS, ('created_at', 'updated_at')):
+        goal = SimpleNamespace(**values)
+        goal.months_remaining = SavingsGoal.months_remaining.fget(goal)
+        row = {key: values[key] for key, _ in SAVINGS_GOAL_FIELDS[:-1]}
+        row['progress_percentage'] = SavingsGoal.progress_percentage.fget(goal)
+        row['months_remaining'] = goal.months_remaining
+        row['is_on_track'] = SavingsGoal.is_on_track.fget(goal)
+        row['category'] = values['category']
+        rows.append(row)
+    return rows
+
+
+def category_limit_rows(queryset):
+    """(total_spent, CategoryLimitSerializer output) for a queryset annotated by rollups.with_category_spent"""
+    fields = CATEGORY_LIMIT_FIELDS + (('total_spent', 'total_spent'),)
+    rows = []
+    for row in _rows(queryset.values_list(*lookups(fields)), fields, ('created_at', 'updated_at')):
+        rows.append((row.pop('total_spent'), row))
+    return rows
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed, producing the
+    same bytes as DRF's compact output. Indented (browsable) output and
+    missing orjson go through the regular renderer.
+    """
+
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        except TypeError:
+            # Out of orjson's range (e.g. integers over 64 bits)
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by DRF as they are not valid in JavaScript string literals
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
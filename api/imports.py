@@ -0,0 +1,156 @@
+import csv
+import io
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+
+from . import response_cache, rollups
+from .models import Category, CategoryLimit, Transaction
+
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_ROWS = 10000
+
+TRUE_VALUES = {'1', 'true', 'yes', 'income'}
+FALSE_VALUES = {'', '0', 'false', 'no', 'expense'}
+
+
+class InvalidImport(ValueError):
+    pass
+
+
+def parse_csv(uploaded_file):
+    """
+    Read an uploaded CSV statement into row dicts. Expected header columns:
+    amount, description, is_income, and either category (id) or category_name.
+    """
+    try:
+        text = uploaded_file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise InvalidImport("CSV file must be UTF-8 encoded")
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or 'amount' not in reader.fieldnames:
+        raise InvalidImport("CSV file needs a header row with an amount column")
+    return list(reader)
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value if value is not None else '').strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError
+
+
+def validate_rows(user, rows):
+    """
+    Validate every row in one pass against the user's categories, which are
+    loaded with a single query. Returns (Transaction objects, errors), where
+    errors maps row index to messages.
+    """
+    max_rows = getattr(settings, 'TRANSACTION_IMPORT_MAX_ROWS', DEFAULT_MAX_ROWS)
+    if not isinstance(rows, list) or not rows:
+        raise InvalidImport("Expected a non-empty list of transactions")
+    if len(rows) > max_rows:
+        raise InvalidImport(f"At most {max_rows} transactions can be imported at once")
+
+    # The database's integer range, as TransactionSerializer enforces on single creates
+    amount_validators = Transaction._meta.get_field('amount').validators
+    categories = dict(Category.objects.filter(user=user).values_list('id', 'name'))
+    category_ids_by_name = {name.lower(): pk for pk, name in categories.items()}
+
+    transactions = []
+    errors = {}
+    for index, row in enumerate(rows):
+        row_errors = []
+        if not isinstance(row, dict):
+            errors[index] = ["Row must be an object"]
+            continue
+
+        try:
+            amount = int(str(row.get('amount', '')).strip())
+        except ValueError:
+            row_errors.append("amount: A valid integer is required.")
+            amount = None
+        else:
+            for validator in amount_validators:
+                try:
+                    validator(amount)
+                except ValidationError as e:
+                    row_errors.extend(f"amount: {message}" for message in e.messages)
+
+        try:
+            is_income = _parse_bool(row.get('is_income', False))
+        except ValueError:
+            row_errors.append("is_income: Must be a valid boolean.")
+            is_income = False
+
+        category_id = None
+        raw_category = row.get('category')
+        category_name = row.get('category_name')
+        if raw_category not in (None, ''):
+            try:
+                category_id = int(raw_category)
+            except (TypeError, ValueError):
+                category_id = None
+            if category_id not in categories:
+                row_errors.append(f'category: Invalid pk "{raw_category}" - object does not exist.')
+        elif category_name:
+            category_id = category_ids_by_name.get(str(category_name).strip().lower())
+            if category_id is None:
+                row_errors.append(f'category_name: Unknown category "{category_name}".')
+
+        if row_errors:
+            errors[index] = row_errors
+            continue
+
+        transactions.append(Transaction(
+            user=user,
+            category_id=category_id,
+            amount=amount,
+            description=str(row.get('description') or ''),
+            is_income=is_income,
+        ))
+    return transactions, errors
+
+
+def import_transactions(user, transactions):
+    """Insert validated transactions with chunked bulk_create in one database transaction"""
+    batch_size = getattr(settings, 'TRANSACTION_IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    with db_transaction.atomic():
+        for start in range(0, len(transactions), batch_size):
+            Transaction.objects.bulk_create(transactions[start:start + batch_size])
+        # bulk_create skips the save signals, so update the rollup once per affected row
+        rollups.record_transactions(transactions)
+        response_cache.invalidate(user.pk, Transaction)
+        db_transaction.on_commit(lambda: response_cache.invalidate(user.pk, Transaction))
+
+
+def limit_checks(user, transactions):
+    """Current-month limit status for every category the import spent in"""
+    category_ids = {t.category_id for t in transactions if not t.is_income and t.category_id}
+    if not category_ids or not user.is_premium:
+        return []
+    limits = rollups.with_category_spent(
+        CategoryLimit.objects.for_listing().filter(user=user, category_id__in=category_ids)
+    )
+    checks = []
+    for limit in limits:
+        total_spent = limit.total_spent
+        limit_amount = limit.limit_amount
+        percentage = (total_spent / limit_amount) * 100 if limit_amount > 0 else 0
+        checks.append({
+            'category': limit.category_id,
+            'category_name': limit.category.name,
+            'limit_amount': limit_amount,
+            'total_spent': total_spent,
+            'remaining': limit_amount - total_spent,
+            'percentage': round(percentage, 2),
+            'exceeded': total_spent > limit_amount,
+            'warning': percentage >= 80
+        })
+    return checks
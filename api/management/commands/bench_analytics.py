@@ -0,0 +1,109 @@
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import analytics, benchdata
+from api.models import Category, Transaction
+
+
+def python_analytics(rows, date_from, date_to, window):
+    """Daily series, rolling mean, monthly totals and percentiles with plain per-row Python loops"""
+    daily = defaultdict(int)
+    monthly = defaultdict(int)
+    by_category = defaultdict(list)
+    for day, category_id, amount, is_income in rows:
+        if not is_income:
+            daily[day] += amount
+            monthly[(day.year, day.month)] += amount
+            by_category[category_id].append(amount)
+    days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    series = [daily[day] for day in days]
+    rolling = [sum(series[i - window + 1:i + 1]) / window for i in range(window - 1, len(series))]
+    stats = {}
+    for category_id, amounts in by_category.items():
+        amounts.sort()
+        stats[category_id] = [amounts[min(int(len(amounts) * p / 100), len(amounts) - 1)] for p in analytics.PERCENTILES]
+    return series, rolling, monthly, stats
+
+
+class Command(BaseCommand):
+    help = "Time the NumPy analytics over multi-year histories against plain Python loops"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, nargs='+', default=[1, 3, 5])
+        parser.add_argument('--per-day', type=int, default=20, help='Transactions per day')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--force', action='store_true',
+                            help=f'Generate and delete {benchdata.PREFIX}* users in a database not marked for benchmarks')
+
+    def handle(self, *args, **options):
+        if not analytics.available():
+            raise CommandError("numpy is not installed")
+        try:
+            user = benchdata.create_user('analytics', force=options['force'])
+        except benchdata.NotABenchDatabase as e:
+            raise CommandError(str(e))
+        rng = random.Random(0)
+        date_to = timezone.localdate()
+        try:
+            categories = [Category.objects.create(name=f'Bench {i}', user=user) for i in range(12)]
+            self.stdout.write(
+                f"{'years':>5} {'rows':>8} {'load ms':>8} {'numpy ms':>9} {'python ms':>10}"
+            )
+            filled_from = date_to + timedelta(days=1)
+            for years in options['years']:
+                date_from = date_to - timedelta(days=365 * years - 1)
+                # Backdated rows, so the history grows towards the past
+                with benchdata.backdating():
+                    self.fill(user, categories, date_from, filled_from, options, rng)
+                filled_from = date_from
+
+                load_ms = self.time(lambda: analytics.load_columns(user, date_from, date_to), options['repeat'])
+                # Both engines start from the same loaded rows
+                columns = analytics.load_columns(user, date_from, date_to)
+                rows = list(zip(
+                    columns['day'].tolist(), columns['category'].tolist(),
+                    columns['amount'].tolist(), columns['is_income'].tolist(),
+                ))
+                numpy_ms = self.time(
+                    lambda: analytics.compute(user, columns, date_from, date_to), options['repeat']
+                )
+                python_ms = self.time(lambda: python_analytics(rows, date_from, date_to, 7), options['repeat'])
+                self.stdout.write(
+                    f"{years:>5} {len(rows):>8} {load_ms:>8.1f} {numpy_ms:>9.1f} {python_ms:>10.1f}"
+                )
+        finally:
+            user.delete()
+
+    def fill(self, user, categories, date_from, date_to, options, rng):
+        """per_day transactions for every day in [date_from, date_to)"""
+        tz = timezone.get_current_timezone()
+
+        def transactions():
+            day = date_from
+            while day < date_to:
+                for _ in range(options['per_day']):
+                    yield Transaction(
+                        user=user,
+                        category=rng.choice(categories) if rng.random() > 0.1 else None,
+                        amount=rng.randint(1, 50_000),
+                        is_income=rng.random() < 0.1,
+                        date=datetime(day.year, day.month, day.day, rng.randint(0, 23), tzinfo=tz),
+                    )
+                day += timedelta(days=1)
+
+        benchdata.create_transactions(transactions(), options['batch_size'])
+
+    def time(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
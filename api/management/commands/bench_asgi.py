@@ -0,0 +1,129 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import benchdata
+from api.models import Person
+from api.user_cache import person_cache
+
+
+def bearer(user):
+    access_token = RefreshToken().access_token
+    access_token['user_id'] = user.id
+    access_token['username'] = user.username
+    return f'Bearer {access_token}'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec of the sync dashboard views called from a WSGI thread pool "
+        "with their async variants called concurrently through the ASGI handler"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+        parser.add_argument('--requests', type=int, default=200, help='Requests per run')
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--transactions', type=int, default=400, help='Transactions per user')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--warm', action='store_true',
+                            help='Keep the person and response caches between runs')
+        parser.add_argument('--keep-data', action='store_true', help='Leave the generated users in place')
+        parser.add_argument('--force', action='store_true',
+                            help=f'Generate and delete {benchdata.PREFIX}* users in a database not marked for benchmarks')
+
+    def handle(self, *args, **options):
+        try:
+            user_ids = benchdata.generate(
+                {'users': options['users'], 'transactions': options['transactions'], 'premium_share': 1.0},
+                seed=options['seed'], force=options['force'],
+            )
+        except benchdata.NotABenchDatabase as e:
+            raise CommandError(str(e))
+        users = list(Person.objects.filter(id__in=user_ids))
+        rng = random.Random(options['seed'])
+        plan = [self.dashboard_request(rng.choice(users), rng) for _ in range(options['requests'])]
+        self.warm = options['warm']
+        self.stdout.write(
+            f"{len(users)} users x {options['transactions']} transactions on {connection.vendor}, "
+            f"{options['requests']} requests per run"
+        )
+        # AsyncClient always sends Host: testserver, so let both clients use it
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                self.stdout.write(
+                    f"{'workers':>7} {'wsgi req/s':>11} {'asgi req/s':>11} {'ratio':>7} {'errors':>7}"
+                )
+                for concurrency in options['concurrency']:
+                    wsgi_seconds, wsgi_errors = self.run_wsgi(plan, concurrency)
+                    asgi_seconds, asgi_errors = self.run_asgi(plan, concurrency)
+                    self.stdout.write(
+                        f"{concurrency:>7} {len(plan) / wsgi_seconds:>11.1f} {len(plan) / asgi_seconds:>11.1f} "
+                        f"{wsgi_seconds / asgi_seconds:>6.2f}x {wsgi_errors + asgi_errors:>7}"
+                    )
+        finally:
+            if not options['keep_data']:
+                benchdata.clear(force=options['force'])
+
+    def dashboard_request(self, user, rng):
+        """One of the reads Main.jsx makes on load, as (path, authorization)"""
+        now = timezone.localtime()
+        return rng.choice([
+            ('account/', bearer(user)),
+            (f'transactions/?user_id={user.id}&date={now.month - 1}&year={now.year}', None),
+            (f'getCategories/?user_id={user.id}', None),
+            ('savings-goals/', bearer(user)),
+        ])
+
+    def reset(self):
+        if not self.warm:
+            cache.clear()
+            person_cache.clear()
+
+    def run_wsgi(self, plan, concurrency):
+        """Each worker thread gets its own client and database connection, like a threaded WSGI server"""
+        def worker(chunk):
+            client = Client()
+            errors = 0
+            try:
+                for path, authorization in chunk:
+                    headers = {'HTTP_AUTHORIZATION': authorization} if authorization else {}
+                    errors += client.get(f'/api/{path}', **headers).status_code >= 400
+            finally:
+                connection.close()
+            return errors
+
+        self.reset()
+        chunks = [plan[i::concurrency] for i in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            errors = sum(pool.map(worker, chunks))
+        return time.perf_counter() - started, errors
+
+    def run_asgi(self, plan, concurrency):
+        """Up to `concurrency` requests in flight on one event loop"""
+        async def run():
+            client = AsyncClient()
+            limit = asyncio.Semaphore(concurrency)
+
+            async def request(path, authorization):
+                headers = {'authorization': authorization} if authorization else {}
+                async with limit:
+                    response = await client.get(f'/api/async/{path}', headers=headers)
+                return response.status_code >= 400
+
+            return sum(await asyncio.gather(*(request(path, authorization) for path, authorization in plan)))
+
+        self.reset()
+        started = time.perf_counter()
+        errors = async_to_sync(run)()
+        return time.perf_counter() - started, errors
@@ -0,0 +1,89 @@
+import random
+import statistics
+import time
+
+from django.db import connection, reset_queries
+from django.db.models import Sum
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import benchdata, rollups
+from api.models import Category, CategoryLimit, Transaction
+from api.periods import current_month_range
+from api.serializers import CategoryLimitSerializer
+
+
+def legacy_category_limit_list(user):
+    """The old category_limit_list GET body: one aggregate per limit over raw transactions"""
+    month_start, _ = current_month_range()
+    limits = CategoryLimit.objects.filter(user=user)
+    limits_data = []
+    for limit_data in CategoryLimitSerializer(limits, many=True).data:
+        total_spent = Transaction.objects.filter(
+            user=user,
+            category_id=limit_data['category'],
+            is_income=False,
+            date__gte=month_start
+        ).aggregate(total=Sum('amount'))['total'] or 0
+        limit_data['current_spending'] = {'total_spent': total_spent}
+        limits_data.append(limit_data)
+    return limits_data
+
+
+class Command(BaseCommand):
+    help = "Compare query count and latency of category_limit_list against the old per-limit aggregates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limits', type=int, nargs='+', default=[1, 10, 30, 100])
+        parser.add_argument('--transactions', type=int, default=5000, help='Transactions per user')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--force', action='store_true',
+                            help=f'Generate and delete {benchdata.PREFIX}* users in a database not marked for benchmarks')
+
+    def handle(self, *args, **options):
+        try:
+            user = benchdata.create_user('limits', force=options['force'], is_premium=True)
+        except benchdata.NotABenchDatabase as e:
+            raise CommandError(str(e))
+        access_token = RefreshToken().access_token
+        access_token['user_id'] = user.id
+        client = APIClient(SERVER_NAME='localhost', HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        rng = random.Random(0)
+        try:
+            self.stdout.write(f"{'limits':>6} {'legacy q':>9} {'legacy ms':>10} {'new q':>6} {'new ms':>7}")
+            for count in options['limits']:
+                self.grow(user, count, options['transactions'], rng)
+                legacy_queries, legacy_ms = self.measure(lambda: legacy_category_limit_list(user), options['repeat'])
+                new_queries, new_ms = self.measure(lambda: client.get('/api/category-limits/'), options['repeat'])
+                self.stdout.write(
+                    f"{count:>6} {legacy_queries:>9} {legacy_ms:>10.2f} {new_queries:>6} {new_ms:>7.2f}"
+                )
+        finally:
+            user.delete()
+
+    def grow(self, user, limit_count, transaction_count, rng):
+        """Top the user up to limit_count limited categories with transactions spread over them"""
+        for i in range(CategoryLimit.objects.filter(user=user).count(), limit_count):
+            category = Category.objects.create(name=f'Bench {i}', user=user)
+            CategoryLimit.objects.create(user=user, category=category, limit_amount=rng.randint(1000, 100_000))
+        Transaction.objects.filter(user=user).delete()
+        categories = list(Category.objects.filter(user=user))
+        benchdata.create_transactions(
+            Transaction(user=user, category=rng.choice(categories), amount=rng.randint(1, 5000))
+            for _ in range(transaction_count)
+        )
+        rollups.rebuild(user)
+
+    def measure(self, fn, repeat):
+        # Requests reset the query log when they start, so capture from an empty log
+        reset_queries()
+        with CaptureQueriesContext(connection) as ctx:
+            fn()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return len(ctx.captured_queries), statistics.median(timings)
@@ -0,0 +1,61 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import benchdata, search
+from api.models import Transaction
+
+
+class Command(BaseCommand):
+    help = "Compare description search through the full-text index against description__icontains"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--terms', nargs='+', default=['sal', 'coffee', 'elec', 'hotel bon'])
+        parser.add_argument('--force', action='store_true',
+                            help=f'Generate and delete {benchdata.PREFIX}* users in a database not marked for benchmarks')
+
+    def handle(self, *args, **options):
+        try:
+            user = benchdata.create_user('search', force=options['force'])
+        except benchdata.NotABenchDatabase as e:
+            raise CommandError(str(e))
+        rng = random.Random(0)
+        try:
+            self.stdout.write(f"Generating {options['rows']} transactions...")
+            benchdata.create_transactions(
+                (
+                    Transaction(
+                        user=user,
+                        amount=rng.randint(1, 50_000),
+                        description=' '.join(rng.sample(benchdata.WORDS, 3)) + f' #{rng.randint(1, 9999)}',
+                    )
+                    for _ in range(options['rows'])
+                ),
+                options['batch_size'],
+            )
+
+            self.stdout.write(f"{'terms':>12} {'rows':>7} {'icontains ms':>13} {'search ms':>10}")
+            base = Transaction.objects.filter(user=user).order_by('-date').values_list('id', flat=True)
+            for text in options['terms']:
+                legacy = base.filter(description__icontains=text)
+                indexed = search.filter_description(base, text)
+                legacy_ms = self.time(legacy, options['repeat'])
+                indexed_ms = self.time(indexed, options['repeat'])
+                self.stdout.write(
+                    f"{text:>12} {len(list(indexed.all())):>7} {legacy_ms:>13.2f} {indexed_ms:>10.2f}"
+                )
+        finally:
+            user.delete()
+
+    def time(self, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
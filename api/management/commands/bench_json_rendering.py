@@ -0,0 +1,77 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api import benchdata, fast_json
+from api.models import Category, Transaction
+from api.serializers import TransactionSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare rows/sec of TransactionSerializer + JSONRenderer against the .values() fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--force', action='store_true',
+                            help=f'Generate and delete {benchdata.PREFIX}* users in a database not marked for benchmarks')
+
+    def handle(self, *args, **options):
+        try:
+            user = benchdata.create_user('json', force=options['force'])
+        except benchdata.NotABenchDatabase as e:
+            raise CommandError(str(e))
+        rng = random.Random(0)
+        if fast_json.orjson is None:
+            self.stdout.write("orjson is not installed, the fast path uses DRF's encoder")
+        try:
+            categories = [Category.objects.create(name=f'Bench {i}', user=user) for i in range(10)]
+            self.stdout.write(
+                f"{'rows':>7} {'serializer ms':>14} {'rows/s':>10} {'fast ms':>9} {'rows/s':>10} {'speedup':>8}"
+            )
+            for count in options['rows']:
+                self.grow(user, categories, count, options['batch_size'], rng)
+                transactions = Transaction.objects.for_listing().filter(user=user).order_by('-date')
+                legacy_ms = self.time(
+                    lambda: JSONRenderer().render(TransactionSerializer(transactions.all(), many=True).data),
+                    options['repeat'],
+                )
+                fast_ms = self.time(
+                    lambda: fast_json.FastJSONRenderer().render(fast_json.transaction_rows(transactions.all())),
+                    options['repeat'],
+                )
+                self.stdout.write(
+                    f"{count:>7} {legacy_ms:>14.1f} {count / legacy_ms * 1000:>10.0f} "
+                    f"{fast_ms:>9.1f} {count / fast_ms * 1000:>10.0f} {legacy_ms / fast_ms:>7.1f}x"
+                )
+        finally:
+            user.delete()
+
+    def grow(self, user, categories, count, batch_size, rng):
+        """Top the user up to count transactions, a tenth of them uncategorised"""
+        missing = count - Transaction.objects.filter(user=user).count()
+        benchdata.create_transactions(
+            (
+                Transaction(
+                    user=user,
+                    category=rng.choice(categories) if rng.random() > 0.1 else None,
+                    amount=rng.randint(1, 50_000),
+                    description=f'Bench transaction {rng.randint(1, 99_999)}',
+                    is_income=rng.random() < 0.2,
+                )
+                for _ in range(missing)
+            ),
+            batch_size,
+        )
+
+    def time(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
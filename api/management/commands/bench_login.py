@@ -0,0 +1,131 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import check_password, get_hashers, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from api import benchdata, passwords
+from api.models import Person
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Time one hash per configured hasher, then run login storms with each hashing pool size "
+        "while a probe thread measures the latency of a cheap endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='Logins per storm')
+        parser.add_argument('--concurrency', type=int, default=8, help='Threads sending logins')
+        parser.add_argument('--workers', type=int, nargs='+', default=[0, 2],
+                            help='Hashing pool sizes to compare; 0 hashes in the request thread')
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--keep-data', action='store_true', help='Leave the generated users in place')
+        parser.add_argument('--force', action='store_true',
+                            help=f'Generate and delete {benchdata.PREFIX}* users in a database not marked for benchmarks')
+
+    def handle(self, *args, **options):
+        try:
+            # Refuse before spending time on the hash timings
+            benchdata.check_database(options['force'])
+        except benchdata.NotABenchDatabase as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'hasher':<16} {'hash ms':>8} {'verify ms':>10}")
+        for hasher in get_hashers():
+            self.stdout.write(f"{hasher.algorithm:<16} {self.hash_timings(hasher.algorithm)}")
+
+        user_ids = benchdata.generate({'users': options['users'], 'transactions': 10}, force=options['force'])
+        self.users = list(Person.objects.filter(id__in=user_ids).order_by('id'))
+        self.stdout.write(
+            f"\n{options['logins']} logins from {options['concurrency']} threads, "
+            f"hashed with {get_hashers()[0].algorithm}"
+        )
+        self.stdout.write(
+            f"{'pool':>5} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'busy':>5} {'probe p95 ms':>13}"
+        )
+        try:
+            # The test client's Host header must be allowed
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for workers in options['workers']:
+                    with override_settings(PASSWORD_HASHING={**passwords.config(), 'POOL_WORKERS': workers}):
+                        self.storm(options['logins'], options['concurrency'], workers)
+                    passwords.hashing_pool.shutdown()
+        finally:
+            if not options['keep_data']:
+                benchdata.clear(force=options['force'])
+
+    def hash_timings(self, algorithm, repeat=5):
+        hash_ms = []
+        verify_ms = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            encoded = make_password(benchdata.PASSWORD, hasher=algorithm)
+            hash_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            check_password(benchdata.PASSWORD, encoded)
+            verify_ms.append((time.perf_counter() - started) * 1000)
+        return f"{statistics.median(hash_ms):>8.1f} {statistics.median(verify_ms):>10.1f}"
+
+    def storm(self, count, concurrency, workers):
+        if workers:
+            # Start the pool before timing, as a server would on its first login
+            passwords.hash_password('warm-up')
+        stop = threading.Event()
+        probe_ms = []
+
+        def probe():
+            client = Client()
+            user = self.users[0]
+            try:
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    client.get(f'/api/getCategories/?user_id={user.id}')
+                    probe_ms.append((time.perf_counter() - started) * 1000)
+                    time.sleep(0.005)
+            finally:
+                connection.close()
+
+        def login(chunk):
+            client = Client()
+            timings = []
+            busy = 0
+            try:
+                for user in chunk:
+                    started = time.perf_counter()
+                    response = client.post(
+                        '/api/login/', {'username': user.username, 'password': benchdata.PASSWORD},
+                        content_type='application/json',
+                    )
+                    timings.append((time.perf_counter() - started) * 1000)
+                    busy += response.status_code == 503
+            finally:
+                connection.close()
+            return timings, busy
+
+        plan = [self.users[i % len(self.users)] for i in range(count)]
+        probe_thread = threading.Thread(target=probe)
+        probe_thread.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(login, [plan[i::concurrency] for i in range(concurrency)]))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        probe_thread.join()
+
+        timings = sorted(ms for chunk_timings, _ in results for ms in chunk_timings)
+        busy = sum(chunk_busy for _, chunk_busy in results)
+        probe_ms.sort()
+        self.stdout.write(
+            f"{workers or 'off':>5} {count / elapsed:>9.1f} {percentile(timings, 0.50):>8.1f} "
+            f"{percentile(timings, 0.95):>8.1f} {busy:>5} {percentile(probe_ms, 0.95):>13.1f}"
+        )
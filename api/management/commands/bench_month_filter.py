@@ -0,0 +1,77 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import benchdata
+from api.models import Transaction
+from api.periods import month_range
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare transaction_list month filtering with date__month against the "
+        "half-open date range on a large synthetic Transaction table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of transactions to generate')
+        parser.add_argument('--years', type=int, default=5, help='Years of history to spread rows over')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated data afterwards')
+        parser.add_argument('--force', action='store_true',
+                            help=f'Generate and delete {benchdata.PREFIX}* users in a database not marked for benchmarks')
+
+    def handle(self, *args, **options):
+        try:
+            user = benchdata.create_user('month', force=options['force'])
+        except benchdata.NotABenchDatabase as e:
+            raise CommandError(str(e))
+        self.generate(user, options)
+        try:
+            now = timezone.localtime()
+            month_start, month_end = month_range(now.year, now.month)
+            queries = {
+                'date__month': Transaction.objects.filter(user=user, date__month=now.month),
+                'date range': Transaction.objects.filter(user=user, date__gte=month_start, date__lt=month_end),
+            }
+            for label, queryset in queries.items():
+                queryset = queryset.order_by('-date').values_list('id', 'amount')
+                rows = len(list(queryset.all()))
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    list(queryset.all())
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{label:>12}: {rows} rows, median {statistics.median(timings):.2f} ms, "
+                    f"max {max(timings):.2f} ms"
+                )
+                self.stdout.write(f"{'':>14}plan: {queryset.explain()}")
+        finally:
+            if not options['keep']:
+                user.delete()
+
+    def generate(self, user, options):
+        now = timezone.now()
+        span = timedelta(days=365 * options['years'])
+        rng = random.Random(0)
+        self.stdout.write(f"Generating {options['rows']} transactions...")
+        # Rows are spread over the history instead of all dated now
+        with benchdata.backdating():
+            benchdata.create_transactions(
+                (
+                    Transaction(
+                        user=user,
+                        amount=rng.randint(1, 50_000),
+                        is_income=rng.random() < 0.1,
+                        date=now - span * rng.random(),
+                    )
+                    for _ in range(options['rows'])
+                ),
+                options['batch_size'],
+            )
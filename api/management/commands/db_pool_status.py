@@ -0,0 +1,53 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from rest_framework.test import APIClient
+
+from api.db_metrics import connection_metrics
+from api.models import Person
+
+
+class Command(BaseCommand):
+    help = (
+        "Check the database connection and report connection reuse metrics. "
+        "With --requests, replay requests from worker threads to show reuse under CONN_MAX_AGE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=0, help='Requests to send to getCategories/')
+        parser.add_argument('--threads', type=int, default=4)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        connection.ensure_connection()
+        healthy = connection.is_usable()
+        self.stdout.write(f"connection usable: {healthy} ({(time.perf_counter() - started) * 1000:.2f} ms)")
+
+        if options['requests']:
+            person = Person.objects.order_by('id').first()
+            if person is None:
+                self.stderr.write("No Person rows to send requests for")
+            else:
+                self.replay(person.id, options['requests'], options['threads'])
+
+        self.stdout.write(json.dumps(connection_metrics.snapshot(), indent=2))
+
+    def replay(self, user_id, count, threads):
+        def send(_):
+            client = APIClient(SERVER_NAME='localhost')
+            response = client.get('/api/getCategories/', {'user_id': user_id})
+            # The test client skips the request_finished cleanup, do it like a real worker would
+            close_old_connections()
+            return response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            statuses = list(pool.map(send, range(count)))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{count} requests on {threads} threads in {elapsed:.2f}s "
+            f"({count / elapsed:.0f} req/s), non-200: {sum(1 for s in statuses if s != 200)}"
+        )
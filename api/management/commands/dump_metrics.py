@@ -0,0 +1,69 @@
+import json
+import os
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.profiling import METRICS_TOKEN_HEADER
+
+
+class Command(BaseCommand):
+    help = "Fetch /api/metrics/ from a running server and print per-endpoint timings (metrics live in each server process)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/metrics/')
+        parser.add_argument('--token', default=os.environ.get('METRICS_TOKEN'),
+                            help='Metrics token of a server not running with DEBUG (default: $METRICS_TOKEN)')
+        parser.add_argument('--json', action='store_true', help='Print the raw metrics document')
+        parser.add_argument('--profiles', action='store_true', help='Also print the sampled cProfile reports')
+        parser.add_argument('--sort', default='p95_ms', help='Endpoint column to sort by, descending')
+
+    def handle(self, *args, **options):
+        try:
+            headers = {METRICS_TOKEN_HEADER: options['token']} if options['token'] else {}
+            with urllib.request.urlopen(urllib.request.Request(options['url'], headers=headers), timeout=10) as response:
+                metrics = json.load(response)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read metrics from {options['url']}: {e}")
+
+        if options['json']:
+            self.stdout.write(json.dumps(metrics, indent=2))
+            return
+
+        endpoints = metrics.get('endpoints', {})
+        self.stdout.write(
+            f"{'endpoint':<45} {'reqs':>6} {'err':>4} {'avg ms':>8} {'p50':>6} {'p95':>6} {'p99':>6} "
+            f"{'queries':>8} {'db ms':>7} {'render ms':>10}"
+        )
+        for name, stats in sorted(endpoints.items(), key=lambda item: -(item[1].get(options['sort']) or 0)):
+            self.stdout.write(
+                f"{name:<45} {stats['requests']:>6} {stats['errors']:>4} {stats['avg_ms']:>8.2f} "
+                f"{stats['p50_ms']:>6} {stats['p95_ms']:>6} {stats['p99_ms']:>6} "
+                f"{self.number(stats['avg_queries']):>8} {self.number(stats['avg_db_ms']):>7} {stats['avg_render_ms']:>10.2f}"
+            )
+
+        connections = metrics.get('connections')
+        if connections:
+            self.stdout.write(
+                f"\nconnections: {connections['open_connections']} open, "
+                f"reuse ratio {connections['reuse_ratio']}, saturation {connections['saturation']}"
+            )
+        cache = metrics.get('person_cache')
+        if cache:
+            self.stdout.write(f"person cache: hit rate {cache['hit_rate']}, size {cache['size']}")
+        last_purge = (metrics.get('tokens') or {}).get('last_purge')
+        if last_purge:
+            self.stdout.write(
+                f"tokens: {last_purge.get('rows_left')} rows, {last_purge.get('bytes')} bytes after the last purge: "
+                f"{last_purge['deleted']} rows in {last_purge['seconds']}s "
+                f"({last_purge['rows_per_second']} rows/s) at {last_purge['finished_at']}"
+            )
+
+        if options['profiles']:
+            for profile in metrics.get('profiles', []):
+                self.stdout.write(f"\n=== {profile['endpoint']} ({profile['total_ms']} ms)\n{profile['report']}")
+
+    @staticmethod
+    def number(value):
+        # Query stats are missing for endpoints only served under ASGI
+        return '-' if value is None else f'{value:.2f}'
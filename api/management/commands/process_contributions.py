@@ -0,0 +1,83 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from api import contributions
+from api.contribution_worker import run_shard_in_process, run_shard_in_thread
+
+
+class Command(BaseCommand):
+    help = (
+        "Process this month's savings goal contributions for every user. "
+        "Users are handled in chunks, each committed on its own, so the run is "
+        "idempotent per month and can simply be restarted after a crash. "
+        "With --workers, users are sharded by id over a thread or process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Users per database transaction')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Contribute even when goals need more than 1/3 of the balance (like force-contributions/)'
+        )
+        parser.add_argument('--workers', type=int, default=1, help='Number of shards processed in parallel')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError("--workers must be at least 1")
+
+        shard_options = {
+            'shards': workers,
+            'chunk_size': options['chunk_size'],
+            'forced': options['force'],
+            'today': timezone.localdate(),
+        }
+        started = time.perf_counter()
+        if workers == 1:
+            shard_stats = [contributions.run_shard(
+                shard=0, **shard_options,
+                progress=lambda stats, last_user_id: self.stdout.write(
+                    f"  processed users up to id {last_user_id}: {stats['goals']} goals so far"
+                ),
+            )]
+        else:
+            # Skip goals another worker or request has locked instead of waiting on them
+            shard_options['skip_locked'] = True
+            shard_stats = self.run_pool(workers, options['pool'], shard_options)
+        elapsed = time.perf_counter() - started
+
+        for stats in shard_stats:
+            self.stdout.write(
+                f"  shard {stats['shard']}: {stats['goals']} goals of {stats['users']} users "
+                f"in {stats['seconds']:.2f}s"
+            )
+        goals = sum(stats['goals'] for stats in shard_stats)
+        self.stdout.write(self.style.SUCCESS(
+            f"Contributed {sum(stats['amount'] for stats in shard_stats)} to {goals} goals of "
+            f"{sum(stats['users'] for stats in shard_stats)} users in {elapsed:.2f}s "
+            f"({goals / elapsed if elapsed else 0:.0f} goals/s)"
+        ))
+        skipped = sum(stats['skipped'] for stats in shard_stats)
+        if skipped:
+            self.stdout.write(
+                f"Skipped {skipped} users whose contributions exceed 1/3 of their balance "
+                f"(use --force to contribute anyway)"
+            )
+
+    def run_pool(self, workers, pool, shard_options):
+        jobs = [{**shard_options, 'shard': shard} for shard in range(workers)]
+        if pool == 'thread':
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(lambda job: run_shard_in_thread(**job), jobs))
+
+        # Fresh interpreters, each opening its own database connection
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            return list(executor.map(run_shard_in_process, jobs))
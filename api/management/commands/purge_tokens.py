@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from api import tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired and used rows from the token table in bounded batches, each committed "
+        "on its own so the purge never holds long locks. Safe to run from cron at any interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows per DELETE (default TOKEN_STORE PURGE_BATCH_SIZE)')
+        parser.add_argument('--pause', type=float, default=None,
+                            help='Seconds to sleep between batches (default TOKEN_STORE PURGE_PAUSE)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        before = tokens.count_rows()
+        size = tokens.table_bytes()
+        self.stdout.write(
+            f"{before['rows']} tokens: {before['expired']} expired, {before['used']} used"
+            + (f", {size} bytes" if size is not None else "")
+        )
+        if options['dry_run']:
+            return
+
+        stats = tokens.purge(batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(
+            f"Deleted {stats['expired']} expired and {stats['used']} used tokens in {stats['batches']} "
+            f"batches, {stats['seconds']:.2f}s ({stats['rows_per_second'] or 0:.0f} rows/s); "
+            f"{stats['rows_left']} left"
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import rollups
+from api.models import Person
+
+
+class Command(BaseCommand):
+    help = "Rebuild the MonthlyCategoryTotal rollup from raw transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only rebuild the rollup of this user id')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user'] is not None:
+            try:
+                user = Person.objects.get(id=options['user'])
+            except Person.DoesNotExist:
+                raise CommandError(f"User {options['user']} not found")
+
+        rows = rollups.rebuild(user)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} monthly total rows"))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q, Sum
+
+from api import rollups
+from api.models import Person, Transaction
+from api.periods import current_month_range
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify the Person balance ledgers against this month's raw transactions. "
+        "With --repair, rebuild the rollup and ledger of every user that disagrees."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true')
+
+    def handle(self, *args, **options):
+        month = rollups.current_month_key()
+        month_start, month_end = current_month_range()
+
+        actual = {
+            row['user_id']: (row['extra_income'] or 0, row['expenses'] or 0)
+            for row in Transaction.objects.filter(date__gte=month_start, date__lt=month_end)
+            .values('user_id').annotate(
+                extra_income=Sum('amount', filter=Q(is_income=True)),
+                expenses=Sum('amount', filter=Q(is_income=False)),
+            ).order_by()
+        }
+
+        checked = stale = 0
+        mismatched = []
+        ledgers = Person.objects.values_list('id', 'balance_month', 'month_extra_income', 'month_expenses')
+        for user_id, balance_month, extra_income, expenses in ledgers.iterator():
+            checked += 1
+            if balance_month != month:
+                # Reloaded from the rollup on next read; only a problem if the rollup is off
+                stale += 1
+                if rollups.monthly_income_and_expenses(user_id, month) != actual.get(user_id, (0, 0)):
+                    mismatched.append(user_id)
+            elif (extra_income, expenses) != actual.get(user_id, (0, 0)):
+                mismatched.append(user_id)
+
+        self.stdout.write(f"Checked {checked} ledgers: {stale} not yet on {month:%Y-%m}, {len(mismatched)} wrong")
+        for user_id in mismatched:
+            self.stdout.write(f"  user {user_id}: expected (extra income, expenses) {actual.get(user_id, (0, 0))}")
+
+        if options['repair'] and mismatched:
+            for person in Person.objects.filter(id__in=mismatched):
+                rollups.rebuild(person)
+                rollups.reset_balance(person.id, month)
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(mismatched)} users"))
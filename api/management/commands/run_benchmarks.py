@@ -0,0 +1,197 @@
+import json
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import benchdata
+from api.models import Person
+from api.user_cache import person_cache
+
+
+DEFAULT_BASELINE = settings.BASE_DIR / 'benchmarks' / 'baseline.json'
+SCENARIOS = ('login', 'dashboard', 'create_transaction', 'history_search', 'contributions')
+
+
+def auth_headers(user):
+    access_token = RefreshToken().access_token
+    access_token['user_id'] = user.id
+    access_token['username'] = user.username
+    return {'HTTP_AUTHORIZATION': f'Bearer {access_token}'}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic data set and time the main request scenarios through the full "
+        "middleware stack, reporting p50/p95/p99 and queries per request against a baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+        parser.add_argument('--requests', type=int, default=50, help='Requests per scenario')
+        parser.add_argument('--users', type=int, default=benchdata.DEFAULT_SCALE['users'])
+        parser.add_argument('--transactions', type=int, default=benchdata.DEFAULT_SCALE['transactions'],
+                            help='Transactions per user')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--warm', action='store_true',
+                            help='Keep the person and response caches between requests')
+        parser.add_argument('--keep-data', action='store_true', help='Leave the generated users in place')
+        parser.add_argument('--force', action='store_true',
+                            help=f'Generate and delete {benchdata.PREFIX}* users in a database not marked for benchmarks')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--write-baseline', action='store_true', help='Save the results as the new baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p95 slowdown before a scenario counts as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            user_ids = benchdata.generate(
+                {'users': options['users'], 'transactions': options['transactions']},
+                seed=options['seed'], force=options['force'],
+            )
+        except benchdata.NotABenchDatabase as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f"Generated {len(user_ids)} users x {options['transactions']} transactions "
+            f"in {time.perf_counter() - started:.1f}s on {connection.vendor}"
+        )
+        self.users = list(Person.objects.filter(id__in=user_ids).order_by('id'))
+        self.premium = [user for user in self.users if user.is_premium]
+        self.rng = random.Random(options['seed'])
+        # localhost passes the empty ALLOWED_HOSTS under DEBUG
+        self.client = APIClient(SERVER_NAME=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost')
+        self.warm = options['warm']
+
+        try:
+            results = {
+                'vendor': connection.vendor,
+                'scale': {'users': options['users'], 'transactions': options['transactions']},
+                'requests': options['requests'],
+                'scenarios': {
+                    name: self.run_scenario(name, options['requests']) for name in options['scenarios']
+                },
+            }
+        finally:
+            if not options['keep_data']:
+                benchdata.clear(force=options['force'])
+
+        self.report(results)
+        regressions = self.compare(results, options['baseline'], options['tolerance'])
+        if options['write_baseline']:
+            with open(options['baseline'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(f"Baseline written to {options['baseline']}")
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+
+    # Scenarios: each returns the list of (method, path, data, headers) requests of one iteration
+
+    def login(self):
+        user = self.rng.choice(self.users)
+        return [('post', '/api/login/', {'username': user.username, 'password': benchdata.PASSWORD}, {})]
+
+    def dashboard(self):
+        """The request Main.jsx makes on load"""
+        user = self.rng.choice(self.users)
+        now = timezone.localtime()
+        return [('get', f'/api/dashboard/?date={now.month - 1}&year={now.year}', None, auth_headers(user))]
+
+    def create_transaction(self):
+        user = self.rng.choice(self.users)
+        data = {'user': user.id, 'amount': self.rng.randint(100, 20_000), 'description': 'bench purchase'}
+        return [('post', '/api/createTransaction/', data, {})]
+
+    def history_search(self):
+        user = self.rng.choice(self.users)
+        term = self.rng.choice(benchdata.WORDS)[:4]
+        return [('get', f'/api/history/?user_id={user.id}&description={term}', None, {})]
+
+    def contributions(self):
+        user = self.rng.choice(self.premium or self.users)
+        return [('post', '/api/savings-goals/process-contributions/', None, auth_headers(user))]
+
+    def run_scenario(self, name, count):
+        timings = []
+        queries = []
+        errors = 0
+        for _ in range(count):
+            if not self.warm:
+                cache.clear()
+                person_cache.clear()
+            elapsed = 0.0
+            query_count = 0
+            for method, path, data, headers in getattr(self, name)():
+                # Requests reset the query log when they start, so capture from an empty log
+                reset_queries()
+                with CaptureQueriesContext(connection) as ctx:
+                    request_started = time.perf_counter()
+                    response = getattr(self.client, method)(path, data, format='json', **headers)
+                    elapsed += time.perf_counter() - request_started
+                query_count += len(ctx.captured_queries)
+                errors += response.status_code >= 500
+            timings.append(elapsed * 1000)
+            queries.append(query_count)
+
+        timings.sort()
+        return {
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'mean_queries': round(statistics.mean(queries), 2),
+            'max_queries': max(queries),
+            'errors': errors,
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'scenario':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'max q':>6} {'errors':>7}"
+        )
+        for name, row in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<20} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+                f"{row['mean_queries']:>8.2f} {row['max_queries']:>6} {row['errors']:>7}"
+            )
+
+    def compare(self, results, path, tolerance):
+        """Print the changes against the baseline and return the regressed scenario names"""
+        try:
+            with open(path) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            self.stdout.write(f"No baseline at {path}")
+            return []
+        if (baseline.get('vendor'), baseline.get('scale')) != (results['vendor'], results['scale']):
+            self.stdout.write("Baseline was recorded on another database or scale; latencies are not comparable")
+
+        regressions = []
+        self.stdout.write(f"\n{'scenario':<20} {'p95 base':>9} {'p95 now':>8} {'change':>8} {'queries':>12}")
+        for name, row in results['scenarios'].items():
+            base = baseline.get('scenarios', {}).get(name)
+            if base is None:
+                continue
+            change = (row['p95_ms'] - base['p95_ms']) / base['p95_ms'] if base['p95_ms'] else 0
+            # Query counts are deterministic, any growth is a regression
+            slower = change > tolerance or row['mean_queries'] > base['mean_queries']
+            if slower:
+                regressions.append(name)
+            self.stdout.write(
+                f"{name:<20} {base['p95_ms']:>9.2f} {row['p95_ms']:>8.2f} {change:>+8.0%} "
+                f"{base['mean_queries']:>5} -> {row['mean_queries']:<5}{'  REGRESSION' if slower else ''}"
+            )
+        return regressions
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_monthly_totals(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    MonthlyCategoryTotal = apps.get_model('api', 'MonthlyCategoryTotal')
+    grouped = Transaction.objects.annotate(
+        month=TruncMonth('date', output_field=models.DateField())
+    ).values('user_id', 'category_id', 'month', 'is_income').annotate(
+        total=Sum('amount'), count=Count('id')
+    ).order_by()
+    MonthlyCategoryTotal.objects.bulk_create(
+        (MonthlyCategoryTotal(**row) for row in grouped.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCategoryTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('is_income', models.BooleanField(default=False)),
+                ('total', models.IntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_totals', to='api.person')),
+            ],
+            options={
+                'unique_together': {('user', 'category', 'month', 'is_income')},
+            },
+        ),
+        migrations.RunPython(populate_monthly_totals, migrations.RunPython.noop),
+    ]
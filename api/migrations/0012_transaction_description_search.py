@@ -0,0 +1,57 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    # External-content FTS5 table over api_transaction.description, kept in sync by triggers
+    """CREATE VIRTUAL TABLE api_transaction_fts USING fts5(
+        description, content='api_transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER api_transaction_fts_insert AFTER INSERT ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+    """CREATE TRIGGER api_transaction_fts_delete AFTER DELETE ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(api_transaction_fts, rowid, description) VALUES ('delete', old.id, old.description);
+    END""",
+    """CREATE TRIGGER api_transaction_fts_update AFTER UPDATE OF description ON api_transaction BEGIN
+        INSERT INTO api_transaction_fts(api_transaction_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO api_transaction_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+    "INSERT INTO api_transaction_fts(api_transaction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_transaction_fts_update",
+    "DROP TRIGGER IF EXISTS api_transaction_fts_delete",
+    "DROP TRIGGER IF EXISTS api_transaction_fts_insert",
+    "DROP TABLE IF EXISTS api_transaction_fts",
+]
+
+MYSQL_FORWARD = [
+    "CREATE FULLTEXT INDEX txn_description_ft ON api_transaction (description)",
+]
+
+MYSQL_BACKWARD = [
+    "DROP INDEX txn_description_ft ON api_transaction",
+]
+
+
+def run(statements_by_vendor):
+    def apply(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_monthlycategorytotal'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'mysql': MYSQL_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'mysql': MYSQL_BACKWARD}),
+        ),
+    ]
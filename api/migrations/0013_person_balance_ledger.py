@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_transaction_description_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='balance_month',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='month_expenses',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='month_extra_income',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_person_balance_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:02
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_uncategorized_duplicates(apps, schema_editor):
+    """Fold duplicate uncategorised rows into one before they become unique"""
+    MonthlyCategoryTotal = apps.get_model('api', 'MonthlyCategoryTotal')
+    uncategorized = MonthlyCategoryTotal.objects.filter(category__isnull=True)
+    duplicates = uncategorized.values('user_id', 'month', 'is_income').annotate(
+        rows=Count('id'), keep=Min('id'), sum_total=Sum('total'), sum_count=Sum('count'),
+    ).filter(rows__gt=1).order_by()
+    for group in duplicates:
+        MonthlyCategoryTotal.objects.filter(pk=group['keep']).update(
+            total=group['sum_total'], count=group['sum_count']
+        )
+        uncategorized.filter(
+            user_id=group['user_id'], month=group['month'], is_income=group['is_income']
+        ).exclude(pk=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_token_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_uncategorized_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='monthlycategorytotal',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('category__isnull', True)), fields=('user', 'month', 'is_income'),
+                name='monthly_total_uncategorized_uniq',
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_monthlycategorytotal_uncategorized_uniq'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='token',
+            name='token_token_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='token',
+            constraint=models.UniqueConstraint(fields=('token',), name='token_token_uniq'),
+        ),
+    ]
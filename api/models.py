@@ -12,6 +12,24 @@ class Token(models.Model):
     user_id = models.IntegerField()
     is_used = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            # Token values are lookup keys: one row each, found through this index
+            models.UniqueConstraint(fields=['token'], name='token_token_uniq'),
+        ]
+        indexes = [
+            # Every token of a user
+            models.Index(fields=['user_id'], name='token_user_idx'),
+            # Purge: a range on expires_at, with is_used read from the index because
+            # booleans are compared as "is_used", which planners can't seek on
+            models.Index(fields=['expires_at', 'is_used'], name='token_expires_used_idx'),
+        ]
+
+
+# Usernames starting with this belong to generated accounts (see api.benchdata)
+# and are refused at registration, so clearing them never hits a real user
+RESERVED_USERNAME_PREFIX = '~'
+
 
 class Person(models.Model):
     id = models.AutoField(primary_key=True)
@@ -23,6 +41,31 @@ class Person(models.Model):
     birthday = models.DateField(null=True, blank=True)
     is_premium = models.BooleanField(default=False)
 
+    # Current-period balance ledger, maintained with F() updates by api.rollups
+    balance_month = models.DateField(null=True, blank=True)
+    month_extra_income = models.IntegerField(default=0)
+    month_expenses = models.IntegerField(default=0)
+
+    # Bumped with an F() update on every account save, so access tokens
+    # carrying claims from an older row can be told apart (see api.claims)
+    version = models.PositiveIntegerField(default=1)
+
+    LEDGER_FIELDS = ('balance_month', 'month_extra_income', 'month_expenses')
+    COUNTER_FIELDS = LEDGER_FIELDS + ('version',)
+
+    def save(self, *args, **kwargs):
+        # Never write back ledger or version columns from a possibly stale
+        # instance; they are only changed through F() updates. Fields that
+        # were never loaded, or that came from a token (see api.claims),
+        # are not written either.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = set(self.COUNTER_FIELDS) | self.get_deferred_fields() | set(getattr(self, '_token_fields', ()))
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
     def set_password(self, raw_password):
         self.password = make_password(raw_password)
         self.save()
@@ -40,6 +83,12 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class TransactionQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Join every relation TransactionSerializer reads, so listings cost one query"""
+        return self.select_related('category')
+
+
 class Transaction(models.Model):
     user = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="transactions")
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
@@ -49,6 +98,18 @@ class Transaction(models.Model):
     description = models.TextField(blank=True)
     is_income = models.BooleanField(default=False)  # distinguish income vs expense
 
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Monthly balance and listings: range on date per user, is_income and amount
+            # read straight from the index. is_income sits after date because booleans
+            # are compared as "NOT is_income", which planners can't use as an equality.
+            models.Index(fields=['user', 'date', 'is_income', 'amount'], name='txn_user_date_idx'),
+            # Category spending / limit checks: the same predicate narrowed to a category
+            models.Index(fields=['user', 'category', 'date', 'is_income', 'amount'], name='txn_user_cat_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.amount}"
 
@@ -122,6 +183,12 @@ class SavingsGoal(models.Model):
         required_monthly = remaining_amount / months_remaining
         return self.monthly_contribution >= required_monthly
 
+class CategoryLimitQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Join every relation CategoryLimitSerializer reads"""
+        return self.select_related('category')
+
+
 class CategoryLimit(models.Model):
     user = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='category_limits')
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
@@ -129,8 +196,37 @@ class CategoryLimit(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CategoryLimitQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'category')
 
     def __str__(self):
-        return f"{self.user.username} - {self.category.name}: {self.limit_amount}"
\ No newline at end of file
+        return f"{self.user.username} - {self.category.name}: {self.limit_amount}"
+
+class MonthlyCategoryTotal(models.Model):
+    """
+    Rollup of Transaction amounts per user, category, calendar month and
+    income/expense, kept in sync by api.rollups so monthly sums are
+    single-row lookups instead of aggregates over raw transactions.
+    """
+    user = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='monthly_totals')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    month = models.DateField()  # first day of the month
+    is_income = models.BooleanField(default=False)
+    total = models.IntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'category', 'month', 'is_income')
+        constraints = [
+            # unique_together never matches NULL categories. MySQL has no partial
+            # indexes and skips this one; there api.rollups locks the owner instead
+            models.UniqueConstraint(
+                fields=['user', 'month', 'is_income'], condition=models.Q(category__isnull=True),
+                name='monthly_total_uncategorized_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.category_id} - {self.month}: {self.total}"
@@ -0,0 +1,92 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.utils.encoders import JSONEncoder
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(transaction):
+    """Build an opaque cursor pointing just after the given transaction"""
+    payload = json.dumps([transaction.date.isoformat(), transaction.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Turn an opaque cursor back into its (date, id) pair"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw_date, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_date = parse_datetime(raw_date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+    if cursor_date is None:
+        raise InvalidCursor("Invalid cursor")
+    return cursor_date, pk
+
+
+def get_page_size(raw_value):
+    """Parse the page_size query parameter, clamped to the configured maximum"""
+    default = getattr(settings, 'TRANSACTION_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'TRANSACTION_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    if raw_value in (None, ''):
+        return default
+    page_size = int(raw_value)
+    if page_size <= 0:
+        raise ValueError("page_size must be positive")
+    return min(page_size, maximum)
+
+
+def paginate_transactions(queryset, cursor, page_size):
+    """
+    Keyset pagination over (date, id), newest first.
+    Returns the page of transactions and the cursor for the next page (or None).
+    """
+    queryset = queryset.order_by('-date', '-id')
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(date__lt=cursor_date) | Q(date=cursor_date, id__lt=cursor_id)
+        )
+
+    # Fetch one extra row to know whether there is a next page
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1])
+    return rows, next_cursor
+
+
+def stream_json_list(queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Stream a queryset as a JSON array, serializing one row at a time so the
+    full result set is never held in memory.
+    """
+    encoder = JSONEncoder()
+
+    def generate():
+        yield '['
+        first = True
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            item = encoder.encode(serializer_class(obj).data)
+            if first:
+                first = False
+                yield item
+            else:
+                yield ',' + item
+        yield ']'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
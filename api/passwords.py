@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, ScryptPasswordHasher, check_password, make_password,
+)
+
+
+DEFAULTS = {
+    'POOL_WORKERS': 2,          # processes hashing passwords; 0 hashes in the request thread
+    'MAX_PENDING': 16,          # jobs queued or running before logins are answered with 503
+    'TIMEOUT': 10,              # seconds a request waits for its job
+    'START_METHOD': 'spawn',    # workers don't inherit the server's threads or connections
+    # RFC 9106's second recommended option: 64 MiB, 3 passes
+    'ARGON2': {'time_cost': 3, 'memory_cost': 65536, 'parallelism': 4},
+    'SCRYPT': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+}
+
+
+def config():
+    configured = getattr(settings, 'PASSWORD_HASHING', {})
+    options = {**DEFAULTS, **configured}
+    # Cost dicts are merged too, so settings may override a single parameter
+    for name in ('ARGON2', 'SCRYPT'):
+        options[name] = {**DEFAULTS[name], **configured.get(name, {})}
+    return options
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with the costs of PASSWORD_HASHING['ARGON2']. Hashes made with
+    other costs still verify and are flagged for an update.
+    """
+
+    @property
+    def time_cost(self):
+        return config()['ARGON2']['time_cost']
+
+    @property
+    def memory_cost(self):
+        return config()['ARGON2']['memory_cost']
+
+    @property
+    def parallelism(self):
+        return config()['ARGON2']['parallelism']
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """scrypt with the costs of PASSWORD_HASHING['SCRYPT']"""
+
+    @property
+    def work_factor(self):
+        return config()['SCRYPT']['work_factor']
+
+    @property
+    def block_size(self):
+        return config()['SCRYPT']['block_size']
+
+    @property
+    def parallelism(self):
+        return config()['SCRYPT']['parallelism']
+
+
+class HashingBusy(Exception):
+    """Too many password jobs are pending; the client should retry later"""
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _verify(password, encoded):
+    """(valid, new encoded hash or None) where the stored hash needs an upgrade"""
+    upgraded = []
+    valid = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return valid, upgraded[0] if upgraded else None
+
+
+class HashingPool:
+    """
+    Runs password hashing in a small process pool so a burst of logins
+    keeps at most POOL_WORKERS cores busy, and turns requests away with
+    HashingBusy once MAX_PENDING jobs are waiting instead of queueing them
+    behind every worker thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+        self._stats = {'jobs': 0, 'inline': 0, 'rejected': 0, 'timeouts': 0, 'restarts': 0}
+
+    def _get_executor(self, options):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=options['POOL_WORKERS'],
+                    mp_context=multiprocessing.get_context(options['START_METHOD']),
+                    initializer=_init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings'),),
+                )
+            return self._executor
+
+    def run(self, fn, *args):
+        options = config()
+        if options['POOL_WORKERS'] <= 0:
+            with self._lock:
+                self._stats['inline'] += 1
+            return fn(*args)
+
+        with self._lock:
+            if self._pending >= options['MAX_PENDING']:
+                self._stats['rejected'] += 1
+                raise HashingBusy()
+            self._pending += 1
+            self._stats['jobs'] += 1
+        future = None
+        try:
+            future = self._get_executor(options).submit(fn, *args)
+            # Released when the job ends rather than when the caller stops
+            # waiting: a timed-out job still occupies a worker
+            future.add_done_callback(self._release)
+            return future.result(timeout=options['TIMEOUT'])
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise HashingBusy()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a new pool for the next job
+            self.shutdown()
+            with self._lock:
+                self._stats['restarts'] += 1
+            raise HashingBusy()
+        finally:
+            if future is None:
+                # Never submitted
+                self._release()
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'pending': self._pending, 'workers': config()['POOL_WORKERS']}
+
+
+hashing_pool = HashingPool()
+
+
+def verify_password(password, encoded):
+    """
+    Check a password against its stored hash off the request thread.
+    Returns (valid, upgraded hash or None); raises HashingBusy.
+    """
+    if not password or not encoded:
+        return False, None
+    return hashing_pool.run(_verify, password, encoded)
+
+
+def hash_password(password):
+    """make_password() off the request thread; raises HashingBusy"""
+    return hashing_pool.run(make_password, password)
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from django.utils import timezone
+
+
+def month_range(year, month):
+    """
+    Half-open [start, end) datetime range covering a calendar month in the
+    current timezone, for index-friendly date__gte / date__lt filters.
+    """
+    tz = timezone.get_current_timezone()
+    start = datetime(year, month, 1, tzinfo=tz)
+    if month == 12:
+        end = datetime(year + 1, 1, 1, tzinfo=tz)
+    else:
+        end = datetime(year, month + 1, 1, tzinfo=tz)
+    return start, end
+
+
+def current_month_range():
+    """Half-open datetime range for the current month"""
+    now = timezone.localtime()
+    return month_range(now.year, now.month)
@@ -0,0 +1,232 @@
+import cProfile
+import hmac
+import io
+import pstats
+import random
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.0,     # fraction of requests run under cProfile
+    'KEEP_PROFILES': 20,    # most recent profiles kept in memory
+    'TOP_FUNCTIONS': 25,    # lines of each profile, by cumulative time
+    'METRICS_TOKEN': None,  # secret /api/metrics/ clients send in X-Metrics-Token
+}
+
+METRICS_TOKEN_HEADER = 'X-Metrics-Token'
+
+# Upper bounds in milliseconds of the latency histogram buckets; the last one is open
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'PROFILING', {})}
+
+
+def metrics_allowed(request):
+    """
+    Metrics name endpoints and internals, so outside DEBUG they are only
+    served to requests carrying METRICS_TOKEN; without one they are off.
+    """
+    if settings.DEBUG:
+        return True
+    expected = config()['METRICS_TOKEN']
+    supplied = request.headers.get(METRICS_TOKEN_HEADER, '')
+    return bool(expected) and hmac.compare_digest(supplied.encode(), expected.encode())
+
+
+class QueryTimer:
+    """connection.execute_wrapper callable counting queries and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.histogram = [0] * len(BUCKETS)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.db_requests = 0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.render_ms = 0.0
+
+    def add(self, status_code, total_ms, queries, db_ms, render_ms):
+        self.requests += 1
+        self.errors += status_code >= 500
+        self.histogram[next(i for i, bound in enumerate(BUCKETS) if total_ms <= bound)] += 1
+        self.total_ms += total_ms
+        self.max_ms = max(self.max_ms, total_ms)
+        # Async requests run their queries on another thread's connection and are not counted
+        if queries is not None:
+            self.db_requests += 1
+            self.queries += queries
+            self.db_ms += db_ms
+        self.render_ms += render_ms
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of requests"""
+        wanted = fraction * self.requests
+        seen = 0
+        for bound, count in zip(BUCKETS, self.histogram):
+            seen += count
+            if seen >= wanted:
+                return bound if bound != float('inf') else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+    def snapshot(self):
+        requests = self.requests or 1
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / requests, 2),
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'avg_queries': round(self.queries / self.db_requests, 2) if self.db_requests else None,
+            'avg_db_ms': round(self.db_ms / self.db_requests, 2) if self.db_requests else None,
+            'avg_render_ms': round(self.render_ms / requests, 2),
+            'histogram': {
+                ('+inf' if bound == float('inf') else f'le_{bound}ms'): count
+                for bound, count in zip(BUCKETS, self.histogram)
+            },
+        }
+
+
+class RequestMetrics:
+    """Per-endpoint request timings of this process, fed by ProfilingMiddleware"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._profiles = deque(maxlen=config()['KEEP_PROFILES'])
+
+    def record(self, endpoint, status_code, total_ms, queries, db_ms, render_ms):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.add(status_code, total_ms, queries, db_ms, render_ms)
+
+    def add_profile(self, endpoint, total_ms, report):
+        with self._lock:
+            self._profiles.append({'endpoint': endpoint, 'total_ms': round(total_ms, 2), 'report': report})
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._profiles.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'endpoints': {name: stats.snapshot() for name, stats in sorted(self._endpoints.items())},
+                'profiles': list(self._profiles),
+            }
+
+
+request_metrics = RequestMetrics()
+
+
+def endpoint_name(request):
+    """METHOD plus the matched URL pattern, so every id maps to one endpoint"""
+    match = getattr(request, 'resolver_match', None)
+    route = f'/{match.route}' if match is not None else 'unresolved'
+    return f'{request.method} {route}'
+
+
+class ProfilingMiddleware:
+    """
+    Time every request, count its queries on the default connection and
+    the time spent rendering the response body, and run a sampled share of
+    requests under cProfile. Place it first so it covers the other middleware.
+    Under ASGI only latency and rendering are recorded.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        options = config()
+        if not options['ENABLED']:
+            return self.get_response(request)
+
+        request._render_seconds = 0.0
+        timer = QueryTimer()
+        profiler = cProfile.Profile() if random.random() < options['SAMPLE_RATE'] else None
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Another profiler is active in this thread
+                    profiler = None
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        total_ms = (time.perf_counter() - started) * 1000
+
+        endpoint = endpoint_name(request)
+        request_metrics.record(
+            endpoint, response.status_code, total_ms,
+            timer.count, timer.seconds * 1000, request._render_seconds * 1000,
+        )
+        if profiler is not None:
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(options['TOP_FUNCTIONS'])
+            request_metrics.add_profile(endpoint, total_ms, report.getvalue())
+        return response
+
+    async def __acall__(self, request):
+        if not config()['ENABLED']:
+            return await self.get_response(request)
+
+        request._render_seconds = 0.0
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        request_metrics.record(
+            endpoint_name(request), response.status_code, total_ms, None, None, request._render_seconds * 1000,
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._render_seconds += time.perf_counter() - started
+        response.add_post_render_callback(rendered)
+        return response
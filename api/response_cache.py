@@ -0,0 +1,211 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Category, CategoryLimit, SavingsGoal, Transaction
+
+
+DEFAULTS = {
+    'TTL': 300,                # seconds a cached response lives
+    'CACHE_ALIAS': 'default',  # Django cache holding versions and responses, None to disable
+    'ALLOW_PROCESS_LOCAL': False,  # use a per-process backend anyway (single process only)
+}
+
+# Backends whose contents other server processes can't see
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+CATEGORIES = 'categories'
+TRANSACTIONS = 'transactions'
+SAVINGS_GOALS = 'savings_goals'
+CATEGORY_LIMITS = 'category_limits'
+SCOPES = (CATEGORIES, TRANSACTIONS, SAVINGS_GOALS, CATEGORY_LIMITS)
+
+# Cached responses that go stale when a row of the model changes:
+# transactions carry the category name, limits carry spending and category name
+AFFECTED_SCOPES = {
+    Transaction: (TRANSACTIONS, CATEGORY_LIMITS),
+    Category: (CATEGORIES, TRANSACTIONS, CATEGORY_LIMITS, SAVINGS_GOALS),
+    SavingsGoal: (SAVINGS_GOALS,),
+    CategoryLimit: (CATEGORY_LIMITS,),
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {})}
+
+
+def shared_cache(alias, allow_process_local=False):
+    """
+    The cache for alias, or None when there is none or it lives in this
+    process only: a version bumped by one worker would never reach the
+    others, which would keep serving what it invalidated.
+    """
+    if not alias:
+        return None
+    cache = caches[alias]
+    if isinstance(cache, PROCESS_LOCAL_BACKENDS) and not allow_process_local:
+        return None
+    return cache
+
+
+def _cache():
+    options = _config()
+    return shared_cache(options['CACHE_ALIAS'], options['ALLOW_PROCESS_LOCAL'])
+
+
+def _version_key(user_id, scope):
+    return f'response:version:{user_id}:{scope}'
+
+
+def _new_version():
+    # Never reuse a number after the version key was evicted
+    return time.time_ns()
+
+
+def versions(user_id, scopes):
+    """Current version of each scope for the user, creating missing ones"""
+    cache = _cache()
+    keys = {_version_key(user_id, scope): scope for scope in scopes}
+    found = cache.get_many(list(keys))
+    result = {}
+    for key, scope in keys.items():
+        if key not in found:
+            cache.add(key, _new_version(), None)
+            found[key] = cache.get(key)
+        result[scope] = found[key]
+    return result
+
+
+async def aversions(user_id, scopes):
+    """Async versions()"""
+    cache = _cache()
+    keys = {_version_key(user_id, scope): scope for scope in scopes}
+    found = await cache.aget_many(list(keys))
+    result = {}
+    for key, scope in keys.items():
+        if key not in found:
+            await cache.aadd(key, _new_version(), None)
+            found[key] = await cache.aget(key)
+        result[scope] = found[key]
+    return result
+
+
+def invalidate(user_id, model=None):
+    """Bump the versions of every scope a change to `model` affects (all scopes if None)"""
+    cache = _cache()
+    if cache is None or user_id is None:
+        return
+    scopes = AFFECTED_SCOPES[model] if model is not None else SCOPES
+    for scope in scopes:
+        key = _version_key(user_id, scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def etag_for(request, user_id, scope, scope_versions):
+    """
+    Strong validator for the response: it changes when any version it depends
+    on is bumped, when the day changes (spending and goal progress are
+    relative to today) and with the query string and format.
+    """
+    parts = [
+        str(user_id),
+        scope,
+        *(f'{name}={scope_versions[name]}' for name in sorted(scope_versions)),
+        timezone.localdate().isoformat(),
+        request.get_full_path(),
+        getattr(getattr(request, 'accepted_renderer', None), 'format', '') or '',
+    ]
+    return '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+def _matches(request, etag):
+    # Only concrete tags: "*" would answer 304 before build() could 404
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = {value.strip() for value in header.split(',')}
+    return etag in candidates or f'W/{etag}' in candidates
+
+
+def _finalize(response, etag):
+    response['ETag'] = etag
+    # Browsers keep the body and revalidate it on every navigation
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def cached(request, user_id, scope, build):
+    """
+    Serve `build()` (a callable returning a Response) through the per-user
+    cache. Unchanged data answers If-None-Match with 304, and a stored body
+    is reused while its version is current; neither touches the database.
+    Only 200 responses are stored.
+    """
+    cache = _cache()
+    try:
+        # Versions are bumped under the integer id, so "05" must not get its own
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        cache = None
+    if cache is None:
+        return build()
+
+    scope_versions = versions(user_id, (scope,))
+    etag = etag_for(request, user_id, scope, scope_versions)
+    if _matches(request, etag):
+        return _finalize(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+    key = 'response:' + etag.strip('"')
+    data = cache.get(key)
+    if data is not None:
+        return _finalize(Response(data, status=status.HTTP_200_OK), etag)
+
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, response.data, _config()['TTL'])
+        _finalize(response, etag)
+    return response
+
+
+async def acached(request, user_id, scope, build):
+    """
+    cached() for async views. `build` is a coroutine function returning an
+    HttpResponse; the rendered body of a 200 is stored, so hits skip
+    rendering as well.
+    """
+    cache = _cache()
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        cache = None
+    if cache is None:
+        return await build()
+
+    scope_versions = await aversions(user_id, (scope,))
+    etag = etag_for(request, user_id, scope, scope_versions)
+    if _matches(request, etag):
+        return _finalize(HttpResponseNotModified(), etag)
+
+    key = 'response-body:' + etag.strip('"')
+    body = await cache.aget(key)
+    if body is not None:
+        return _finalize(HttpResponse(body, content_type='application/json'), etag)
+
+    response = await build()
+    if response.status_code == status.HTTP_200_OK:
+        await cache.aset(key, response.content, _config()['TTL'])
+        _finalize(response, etag)
+    return response
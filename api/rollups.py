@@ -0,0 +1,246 @@
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count, DateField, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from . import response_cache
+from .models import MonthlyCategoryTotal, Person, Transaction
+
+
+def month_key(value):
+    """First day of the (local) calendar month containing a datetime"""
+    return timezone.localtime(value).date().replace(day=1)
+
+
+def current_month_key():
+    return month_key(timezone.now())
+
+
+def apply_delta(user_id, category_id, month, is_income, amount, count, create=True):
+    """
+    Add amount/count to one rollup row with an F() update, creating the row
+    if it does not exist yet. With create=False a missing row is left alone.
+    The owner's balance ledger moves along with it, in the same transaction,
+    so a ledger reset never sees the rollup change without the ledger one.
+    """
+    rows = MonthlyCategoryTotal.objects.filter(
+        user_id=user_id, category_id=category_id, month=month, is_income=is_income
+    )
+    with db_transaction.atomic(savepoint=False):
+        if not rows.update(total=F('total') + amount, count=F('count') + count) and create:
+            try:
+                with db_transaction.atomic():
+                    if category_id is None:
+                        # Not every database enforces uniqueness of uncategorised rows,
+                        # so first writes of one user queue on the owner and look again
+                        lock_ledger(user_id)
+                        created = not rows.update(total=F('total') + amount, count=F('count') + count)
+                    else:
+                        created = True
+                    if created:
+                        MonthlyCategoryTotal.objects.create(
+                            user_id=user_id, category_id=category_id, month=month,
+                            is_income=is_income, total=amount, count=count,
+                        )
+            except IntegrityError:
+                # Another request created the row in the meantime
+                rows.update(total=F('total') + amount, count=F('count') + count)
+        apply_balance_delta(user_id, month, is_income, amount)
+
+
+def lock_ledger(user_id):
+    """Lock the owner's Person row and return its (balance_month, extra income, expenses)"""
+    return Person.objects.select_for_update().filter(pk=user_id).values_list(
+        'balance_month', 'month_extra_income', 'month_expenses'
+    ).get()
+
+
+def apply_balance_delta(user_id, month, is_income, amount):
+    """
+    Move the Person balance ledger by amount if it tracks `month`. A ledger
+    still on an older period is reset from the rollup when the current
+    month is written to; writes to past months don't touch it. Must run in
+    the transaction that changed the rollup.
+    """
+    field = 'month_extra_income' if is_income else 'month_expenses'
+    if Person.objects.filter(pk=user_id, balance_month=month).update(**{field: F(field) + amount}):
+        return
+    if month != current_month_key():
+        return
+    with db_transaction.atomic(savepoint=False):
+        if lock_ledger(user_id)[0] == month:
+            # Another writer reset the ledger after our update missed. Our
+            # rollup change was not committed yet, so its totals lack it
+            Person.objects.filter(pk=user_id).update(**{field: F(field) + amount})
+        else:
+            # The rollup read includes our own change
+            reset_balance(user_id, month)
+
+
+def reset_balance(user_id, month=None):
+    """
+    Point the ledger at a month and load its totals from the rollup. The
+    owner's row is locked first, so concurrent ledger updates wait and
+    land on top of the loaded totals instead of being overwritten.
+    """
+    month = month or current_month_key()
+    with db_transaction.atomic(savepoint=False):
+        lock_ledger(user_id)
+        extra_income, expenses = monthly_income_and_expenses(user_id, month)
+        Person.objects.filter(pk=user_id).update(
+            balance_month=month, month_extra_income=extra_income, month_expenses=expenses
+        )
+    return extra_income, expenses
+
+
+def current_balance(user):
+    """Income + extra income - expenses for the current month, read from the ledger"""
+    income, balance_month, extra_income, expenses = Person.objects.filter(pk=user.pk).values_list(
+        'income', 'balance_month', 'month_extra_income', 'month_expenses'
+    ).get()
+    month = current_month_key()
+    if balance_month != month:
+        with db_transaction.atomic(savepoint=False):
+            # A writer may have moved the ledger to this month since the read above
+            balance_month, extra_income, expenses = lock_ledger(user.pk)
+            if balance_month != month:
+                extra_income, expenses = reset_balance(user.pk, month)
+    return income + extra_income - expenses
+
+
+def record_transaction(transaction, sign=1):
+    """Add (sign=1) or remove (sign=-1) a transaction from the rollup"""
+    apply_delta(
+        transaction.user_id,
+        transaction.category_id,
+        month_key(transaction.date),
+        transaction.is_income,
+        sign * transaction.amount,
+        sign,
+        create=sign > 0,
+    )
+
+
+def record_transactions(transactions):
+    """Add many new transactions to the rollup with one update per affected row"""
+    deltas = {}
+    for transaction in transactions:
+        key = (transaction.user_id, transaction.category_id, month_key(transaction.date), transaction.is_income)
+        total, count = deltas.get(key, (0, 0))
+        deltas[key] = (total + transaction.amount, count + 1)
+    for (user_id, category_id, month, is_income), (total, count) in deltas.items():
+        apply_delta(user_id, category_id, month, is_income, total, count)
+
+
+def uncategorize(category_id):
+    """
+    Fold a category's rollup rows into the uncategorised rows of the same
+    user, month and is_income before the category is deleted. Left to
+    SET_NULL they would become extra NULL rows, and every later
+    uncategorised delta would be added to each.
+    Totals don't change, so the balance ledgers stay as they are.
+    """
+    with db_transaction.atomic():
+        for row in MonthlyCategoryTotal.objects.filter(category_id=category_id).select_for_update():
+            merged = MonthlyCategoryTotal.objects.filter(
+                user_id=row.user_id, category=None, month=row.month, is_income=row.is_income
+            ).update(total=F('total') + row.total, count=F('count') + row.count)
+            if merged:
+                row.delete()
+            else:
+                row.category_id = None
+                row.save(update_fields=['category'])
+
+
+def category_spent(user, category_id, month=None):
+    """Expenses for one category in a month (current month by default)"""
+    return MonthlyCategoryTotal.objects.filter(
+        user=user,
+        category_id=category_id,
+        month=month or current_month_key(),
+        is_income=False,
+    ).aggregate(total=Sum('total'))['total'] or 0
+
+
+def with_category_spent(queryset, month=None):
+    """
+    Annotate a queryset of rows with user and category fields (e.g. CategoryLimit)
+    with total_spent for that category in a month, in the same SQL query.
+    """
+    spent = MonthlyCategoryTotal.objects.filter(
+        user=OuterRef('user'),
+        category=OuterRef('category'),
+        month=month or current_month_key(),
+        is_income=False,
+    ).values('category').annotate(total=Sum('total')).values('total')
+    return queryset.annotate(total_spent=Coalesce(Subquery(spent), 0))
+
+
+def monthly_income_and_expenses(user, month=None):
+    """(extra income, expenses) for a month in one query over the rollup"""
+    totals = MonthlyCategoryTotal.objects.filter(
+        user=user, month=month or current_month_key()
+    ).aggregate(
+        income=Sum('total', filter=Q(is_income=True)),
+        expenses=Sum('total', filter=Q(is_income=False)),
+    )
+    return totals['income'] or 0, totals['expenses'] or 0
+
+
+def category_summary(user, start_month, end_month):
+    """
+    Per-category totals and counts for the months in [start_month, end_month),
+    split into income and expenses, from one grouped query over the rollup
+    """
+    rows = MonthlyCategoryTotal.objects.filter(
+        user=user, month__gte=start_month, month__lt=end_month
+    ).values('category_id', 'category__name', 'is_income').annotate(
+        category_total=Sum('total'), category_count=Sum('count')
+    ).filter(category_count__gt=0).order_by('is_income', '-category_total', 'category_id')
+
+    summary = {
+        'income': {'total': 0, 'count': 0},
+        'expenses': {'total': 0, 'count': 0},
+        'categories': [],
+    }
+    for row in rows:
+        side = summary['income' if row['is_income'] else 'expenses']
+        side['total'] += row['category_total']
+        side['count'] += row['category_count']
+        summary['categories'].append({
+            'category': row['category_id'],
+            'category_name': row['category__name'] or "No category",
+            'is_income': row['is_income'],
+            'total': row['category_total'],
+            'count': row['category_count'],
+        })
+    return summary
+
+
+def rebuild(user=None):
+    """Recompute the rollup from raw transactions, for everyone or one user"""
+    transactions = Transaction.objects.all()
+    rollups = MonthlyCategoryTotal.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+        rollups = rollups.filter(user=user)
+
+    grouped = transactions.annotate(
+        month=TruncMonth('date', output_field=DateField())
+    ).values('user_id', 'category_id', 'month', 'is_income').annotate(
+        total=Sum('amount'), count=Count('id')
+    ).order_by()
+
+    people = Person.objects.all() if user is None else Person.objects.filter(pk=user.pk)
+    with db_transaction.atomic():
+        rollups.delete()
+        MonthlyCategoryTotal.objects.bulk_create(
+            (MonthlyCategoryTotal(**row) for row in grouped.iterator()),
+            batch_size=1000,
+        )
+        # Ledgers reload from the new rollup on their next read
+        people.update(balance_month=None)
+    # Cached limit spending was computed from the old rows
+    for user_id in people.values_list('pk', flat=True).iterator():
+        response_cache.invalidate(user_id, Transaction)
+    return rollups.count()
@@ -0,0 +1,47 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+# InnoDB ignores words shorter than innodb_ft_min_token_size in FULLTEXT searches
+DEFAULT_MYSQL_MIN_TOKEN_SIZE = 3
+
+
+def search_terms(text):
+    return TERM_RE.findall(text or '')
+
+
+def filter_description(queryset, text):
+    """
+    Narrow a Transaction queryset to rows whose description contains every
+    word of `text`, each matched as a word prefix ("sal" finds "Salary").
+
+    Uses the SQLite FTS5 table or the MySQL FULLTEXT index created by
+    migration 0012; other backends, and MySQL searches for words shorter
+    than the FULLTEXT minimum token size, fall back to icontains.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(id__in=RawSQL(
+            "SELECT rowid FROM api_transaction_fts WHERE api_transaction_fts MATCH %s", [match]
+        ))
+
+    min_token_size = getattr(settings, 'SEARCH_MYSQL_MIN_TOKEN_SIZE', DEFAULT_MYSQL_MIN_TOKEN_SIZE)
+    if vendor == 'mysql' and all(len(term) >= min_token_size for term in terms):
+        match = ' '.join(f'+{term}*' for term in terms)
+        return queryset.filter(id__in=RawSQL(
+            "SELECT id FROM api_transaction WHERE MATCH(description) AGAINST (%s IN BOOLEAN MODE)", [match]
+        ))
+
+    for term in terms:
+        queryset = queryset.filter(description__icontains=term)
+    return queryset
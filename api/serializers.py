@@ -1,7 +1,7 @@
 # serializers.py
 from rest_framework import serializers
-from .models import Transaction, Person, Token, Category, CategoryLimit, SavingsGoal
-from django.contrib.auth.hashers import make_password 
+from .models import RESERVED_USERNAME_PREFIX, Transaction, Person, Token, Category, CategoryLimit, SavingsGoal
+from .passwords import hash_password
 
 class TokenSerializer(serializers.ModelSerializer):
     class Meta:
@@ -28,6 +28,11 @@ class RegisterSerializer(serializers.ModelSerializer):
             'birthday': {'required': False, 'allow_null': True},
         }
 
+    def validate_username(self, value):
+        if value.startswith(RESERVED_USERNAME_PREFIX):
+            raise serializers.ValidationError(f"Usernames can't start with {RESERVED_USERNAME_PREFIX}")
+        return value
+
     def validate(self, data):
         if data['password'] != data['repassword']:
             raise serializers.ValidationError("Passwords do not match!")
@@ -38,7 +43,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         validated_data.pop('repassword')
         
         # Hash the password
-        validated_data['password'] = make_password(validated_data['password'])
+        validated_data['password'] = hash_password(validated_data['password'])
         
         # Set default values for optional fields
         if 'income' not in validated_data:
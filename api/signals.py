@@ -0,0 +1,104 @@
+from django.core.signals import request_finished, request_started
+from django.db import transaction as db_transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import claims, response_cache, rollups
+from .db_metrics import connection_metrics
+from .user_cache import person_cache
+from .models import Category, CategoryLimit, Person, SavingsGoal, Transaction
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    """Keep the stored row of an updated transaction so the rollup can move its amount"""
+    instance._previous = None
+    if raw or instance.pk is None:
+        return
+    instance._previous = Transaction.objects.filter(pk=instance.pk).only(
+        'user_id', 'category_id', 'date', 'amount', 'is_income'
+    ).first()
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    if previous is not None:
+        rollups.record_transaction(previous, sign=-1)
+    rollups.record_transaction(instance)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    # Deleting a Person cascades to its rollup rows as well, nothing to update
+    if isinstance(origin, Person) or getattr(origin, 'model', None) is Person:
+        return
+    rollups.record_transaction(instance, sign=-1)
+
+
+@receiver(pre_delete, sender=Category)
+def fold_rollup_into_uncategorized(sender, instance, origin=None, **kwargs):
+    # The category's transactions become uncategorised; its rollup rows must merge the same way
+    if isinstance(origin, Person) or getattr(origin, 'model', None) is Person:
+        return
+    rollups.uncategorize(instance.pk)
+
+
+@receiver(post_save, sender=Person)
+@receiver(post_delete, sender=Person)
+def invalidate_cached_person(sender, instance, raw=False, **kwargs):
+    """Account updates (account_view PATCH, set_password, admin) drop the cached row"""
+    person_cache.invalidate(instance.pk)
+    # Again once committed, in case another request re-cached the old row meanwhile
+    db_transaction.on_commit(lambda: person_cache.invalidate(instance.pk))
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SavingsGoal)
+@receiver(post_delete, sender=SavingsGoal)
+@receiver(post_save, sender=CategoryLimit)
+@receiver(post_delete, sender=CategoryLimit)
+def invalidate_cached_responses(sender, instance, raw=False, **kwargs):
+    """Move the owner's cached list responses that show this row to a new version"""
+    if raw:
+        return
+    response_cache.invalidate(instance.user_id, sender)
+    # Again once committed, so a response built from the old rows meanwhile is not reused
+    db_transaction.on_commit(lambda: response_cache.invalidate(instance.user_id, sender))
+
+
+@receiver(post_save, sender=Person)
+def bump_person_version(sender, instance, created, raw=False, **kwargs):
+    """Account saves move the row version, so tokens signed with the old claims are not trusted"""
+    if created or raw:
+        return
+    claims.bump(instance.pk)
+    # The instance now matches the row again, e.g. for tokens minted from it
+    instance.version += 1
+    db_transaction.on_commit(lambda: claims.forget(instance.pk))
+
+
+@receiver(post_delete, sender=Person)
+def invalidate_deleted_person_responses(sender, instance, **kwargs):
+    response_cache.invalidate(instance.pk)
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    connection_metrics.connection_created(connection)
+
+
+@receiver(request_started)
+def count_request_started(sender, **kwargs):
+    connection_metrics.request_started()
+
+
+@receiver(request_finished)
+def count_request_finished(sender, **kwargs):
+    connection_metrics.request_finished()
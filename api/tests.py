@@ -1,3 +1,1177 @@
-from django.test import TestCase
+import io
+import json
+import os
+import re
+import tempfile
+from datetime import date, datetime, time, timedelta
+from time import sleep
+from unittest import skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction as db_transaction
+from django.db.models import Sum
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import analytics, benchdata, claims, rollups, tokens
+from .passwords import HashingBusy, hashing_pool
+from .models import Person, Category, Transaction, CategoryLimit, MonthlyCategoryTotal, SavingsGoal, Token
+from .profiling import request_metrics
+from .user_cache import PersonCache, person_cache
+from .views import calculate_current_balance
+
+
+def auth_header(user):
+    """Build the Authorization header the frontend sends after login"""
+    access_token = RefreshToken().access_token
+    access_token['user_id'] = user.id
+    access_token['username'] = user.username
+    return {'HTTP_AUTHORIZATION': f'Bearer {access_token}'}
+
+
+def used_indexes(sql):
+    """Run a captured SQL statement through EXPLAIN and return the index names the planner picked"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            indexes = re.findall(r'USING (?:COVERING )?INDEX (\w+)', plan)
+            # Named like MySQL's primary key index
+            return indexes + ['PRIMARY'] * plan.count('USING INTEGER PRIMARY KEY')
+        cursor.execute('EXPLAIN ' + sql)
+        columns = [col[0] for col in cursor.description]
+        return [row[columns.index('key')] for row in cursor.fetchall() if row[columns.index('key')]]
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Asserts that an endpoint runs an exact number of queries no matter how
+    many rows it returns, so N+1 regressions fail the test suite.
+    """
+
+    row_counts = (1, 5, 25)
+
+    def setUp(self):
+        self.client = APIClient()
+        person_cache.clear()
+        cache.clear()
+        self.user = Person.objects.create(
+            username='budget', name='Budget User', email='budget@example.com', password='x'
+        )
+        self.categories = [
+            Category.objects.create(name=f'Category {i}', user=self.user) for i in range(5)
+        ]
+
+    def add_transactions(self, count):
+        created = Transaction.objects.bulk_create(
+            Transaction(
+                user=self.user,
+                category=self.categories[i % len(self.categories)],
+                amount=100 + i,
+                description=f'Transaction {i}',
+            )
+            for i in range(count)
+        )
+        rollups.record_transactions(created)
+
+    def assertQueryBudget(self, budget, fetch, grow):
+        """Run fetch() after each grow(n) step and check it always costs `budget` queries"""
+        total = 0
+        for count in self.row_counts:
+            grow(count - total)
+            total = count
+            # Every measured request starts with a cold Person cache
+            person_cache.clear()
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                response = fetch()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                len(ctx.captured_queries), budget,
+                f'{len(ctx.captured_queries)} queries with {count} rows, expected {budget}:\n'
+                + '\n'.join(q['sql'] for q in ctx.captured_queries)
+            )
+
+
+class TransactionQueryBudgetTests(QueryBudgetTestCase):
+
+    def test_transaction_list(self):
+        # Person lookup + one joined listing query
+        self.assertQueryBudget(
+            2,
+            lambda: self.client.get('/api/transactions/', {'user_id': self.user.id}),
+            self.add_transactions,
+        )
+
+    def test_transaction_list_cursor_page(self):
+        self.assertQueryBudget(
+            2,
+            lambda: self.client.get('/api/transactions/', {'user_id': self.user.id, 'page_size': 10}),
+            self.add_transactions,
+        )
+
+    def test_transaction_history(self):
+        self.assertQueryBudget(
+            1,
+            lambda: self.client.get('/api/history/', {'user_id': self.user.id}),
+            self.add_transactions,
+        )
+
+    def test_transaction_detail(self):
+        self.add_transactions(1)
+        transaction = Transaction.objects.first()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/transactions/{transaction.id}/')
+        self.assertEqual(response.data['category_name'], transaction.category.name)
+
+
+class TransactionPaginationTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.add_transactions(25)
+        # Identical dates leave the id as the only tie-breaker
+        Transaction.objects.update(date=timezone.now())
+        self.url = f'/api/transactions/?user_id={self.user.id}'
+
+    def walk(self, page_size):
+        rows = []
+        cursor = None
+        while True:
+            params = f'&page_size={page_size}' + (f'&cursor={cursor}' if cursor else '')
+            page = self.client.get(self.url + params).json()
+            self.assertLessEqual(len(page['results']), page_size)
+            rows += page['results']
+            cursor = page['next_cursor']
+            if cursor is None:
+                return rows
+
+    def test_cursor_walk_visits_every_row_once(self):
+        expected = list(Transaction.objects.order_by('-id').values_list('id', flat=True))
+        for page_size in (1, 4, 25, 100):
+            self.assertEqual([row['id'] for row in self.walk(page_size)], expected, page_size)
+
+    def test_invalid_cursor_and_page_size(self):
+        for params in ('&cursor=not-a-cursor', '&cursor=WyJ4Il0', '&page_size=0', '&page_size=-5', '&page_size=x'):
+            self.assertEqual(self.client.get(self.url + params).status_code, 400, params)
+
+    def test_stream_matches_pages(self):
+        response = self.client.get(self.url + '&stream=1')
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, self.walk(7))
+
+
+class IndexPlanTests(QueryBudgetTestCase):
+    """
+    Runs the queries of the hot views through EXPLAIN and checks the planner
+    answers them from an index (SQLite and MySQL).
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_premium = True
+        self.user.income = 1000000
+        self.user.save()
+        self.add_transactions(50)
+        CategoryLimit.objects.create(user=self.user, category=self.categories[0], limit_amount=500)
+
+    def assertQueriesUseIndex(self, response_fn, table, index_name):
+        """Every query the view runs against `table` must use an index containing index_name"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = response_fn()
+        self.assertLess(response.status_code, 400)
+        queries = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and f'FROM {connection.ops.quote_name(table)}' in q['sql']
+        ]
+        self.assertTrue(queries, f'view did not read {table}')
+        for sql in queries:
+            indexes = used_indexes(sql)
+            self.assertTrue(any(index_name in index for index in indexes), f'{indexes}: {sql}')
+
+    def test_transaction_list_month(self):
+        self.assertQueriesUseIndex(
+            lambda: self.client.get('/api/transactions/', {'user_id': self.user.id, 'date': 0, 'year': 2025}),
+            'api_transaction', 'txn_user_date_idx',
+        )
+
+    def test_calculate_current_balance(self):
+        self.assertQueriesUseIndex(
+            lambda: self.client.post(
+                '/api/savings-goals/',
+                {'name': 'Trip', 'target_amount': 1000, 'monthly_contribution': 100},
+                format='json', **auth_header(self.user)
+            ),
+            # The balance comes from the ledger on the Person row
+            'api_person', 'PRIMARY',
+        )
+
+    def test_check_category_spending(self):
+        self.assertQueriesUseIndex(
+            lambda: self.client.get(
+                f'/api/category-spending/{self.categories[0].id}/', **auth_header(self.user)
+            ),
+            'api_monthlycategorytotal', 'monthlycategorytotal',
+        )
+
+    def test_create_transaction_limit_check(self):
+        self.assertQueriesUseIndex(
+            lambda: self.client.post(
+                '/api/createTransaction/',
+                {'user': self.user.id, 'category': self.categories[0].id, 'amount': 10},
+                format='json'
+            ),
+            'api_monthlycategorytotal', 'monthlycategorytotal',
+        )
+
+    def test_category_limit_list(self):
+        self.assertQueriesUseIndex(
+            lambda: self.client.get('/api/category-limits/', **auth_header(self.user)),
+            'api_monthlycategorytotal', 'monthlycategorytotal',
+        )
+
+
+class MonthlyRollupTests(QueryBudgetTestCase):
+
+    def rollup(self):
+        return sorted(
+            MonthlyCategoryTotal.objects.filter(total__gt=0).values_list('category_id', 'is_income', 'total', 'count'),
+            key=lambda row: (row[0] or 0, row[1]),
+        )
+
+    def rebuilt(self):
+        rollups.rebuild(self.user)
+        return self.rollup()
+
+    def test_create_patch_delete_keep_rollup_in_sync(self):
+        food, rent = self.categories[:2]
+        self.client.post('/api/createTransaction/', {'user': self.user.id, 'category': food.id, 'amount': 30}, format='json')
+        self.client.post('/api/createTransaction/', {'user': self.user.id, 'category': food.id, 'amount': 20}, format='json')
+        self.client.post('/api/createTransaction/', {'user': self.user.id, 'amount': 500, 'is_income': True}, format='json')
+        self.assertEqual(self.rollup(), [(None, True, 500, 1), (food.id, False, 50, 2)])
+
+        moved = Transaction.objects.get(amount=20)
+        self.client.patch(f'/api/transactions/{moved.id}/', {'category': rent.id, 'amount': 25}, format='json')
+        self.assertEqual(self.rollup(), [(None, True, 500, 1), (food.id, False, 30, 1), (rent.id, False, 25, 1)])
+
+        self.client.delete(f'/api/transactions/{moved.id}/')
+        self.assertEqual(self.rollup(), [(None, True, 500, 1), (food.id, False, 30, 1)])
+        self.assertEqual(self.rollup(), self.rebuilt())
+
+    def test_deleting_a_category_merges_its_rows_into_uncategorized(self):
+        food = self.categories[0]
+        self.client.post('/api/createTransaction/', {'user': self.user.id, 'amount': 10}, format='json')
+        self.client.post('/api/createTransaction/', {'user': self.user.id, 'category': food.id, 'amount': 20}, format='json')
+        food.delete()
+        self.client.post('/api/createTransaction/', {'user': self.user.id, 'amount': 5}, format='json')
+
+        self.assertEqual(self.rollup(), [(None, False, 35, 3)])
+        self.assertEqual(self.rollup(), self.rebuilt())
+        self.assertEqual(rollups.monthly_income_and_expenses(self.user), (0, 35))
+
+    @skipUnless(connection.features.supports_partial_indexes, "partial unique indexes are not supported")
+    def test_uncategorized_rows_are_unique(self):
+        month = rollups.current_month_key()
+        MonthlyCategoryTotal.objects.create(user=self.user, month=month, total=1, count=1)
+        with self.assertRaises(IntegrityError), db_transaction.atomic():
+            MonthlyCategoryTotal.objects.create(user=self.user, month=month, total=1, count=1)
+        rollups.apply_delta(self.user.id, None, month, False, 5, 1)
+        self.assertEqual(self.rollup(), [(None, False, 6, 2)])
+
+    def test_balance_reads_rollup(self):
+        self.user.income = 1000
+        self.user.save()
+        self.add_transactions(3)
+        self.assertEqual(calculate_current_balance(self.user), 1000 - (100 + 101 + 102))
+
+
+class CategoryLimitQueryBudgetTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_premium = True
+        self.user.save()
+        self.add_transactions(20)
+
+    def add_limits(self, count):
+        existing = CategoryLimit.objects.filter(user=self.user).count()
+        for i in range(existing, existing + count):
+            category = Category.objects.create(name=f'Limited {i}', user=self.user)
+            CategoryLimit.objects.create(user=self.user, category=category, limit_amount=1000)
+
+    def test_category_limit_list(self):
+        # Person lookup (the view's own authentication hits the cache), then limits with their spending
+        self.assertQueryBudget(
+            2,
+            lambda: self.client.get('/api/category-limits/', **auth_header(self.user)),
+            self.add_limits,
+        )
+
+    def test_category_limit_list_spending(self):
+        CategoryLimit.objects.create(user=self.user, category=self.categories[0], limit_amount=1000)
+        response = self.client.get('/api/category-limits/', **auth_header(self.user))
+        spent = sum(t.amount for t in Transaction.objects.filter(category=self.categories[0]))
+        self.assertEqual(response.data[0]['current_spending']['total_spent'], spent)
+        self.assertEqual(response.data[0]['category_name'], self.categories[0].name)
+
+
+class PersonCacheTests(QueryBudgetTestCase):
+
+    def test_tiers_and_counters(self):
+        people = PersonCache(max_size=10, ttl=60)
+        with self.assertNumQueries(1):
+            people.get(self.user.id)
+            people.get(self.user.id)
+        people.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(people.get(self.user.id).username, 'budget')
+        stats = people.stats()
+        self.assertEqual((stats['misses'], stats['local_hits'], stats['shared_hits']), (1, 1, 1))
+
+    def test_lru_eviction(self):
+        people = PersonCache(max_size=1, ttl=60, cache_alias='')
+        other = Person.objects.create(username='other', name='Other', email='other@example.com', password='x')
+        people.get(self.user.id)
+        people.get(other.id)
+        self.assertEqual(people.stats()['size'], 1)
+        with self.assertNumQueries(1):
+            people.get(self.user.id)
+
+    def test_process_local_tiers_are_refused_by_default(self):
+        people = PersonCache(max_size=10, ttl=60, allow_process_local=False)
+        people.get(self.user.id)
+        # Another worker changes the plan; no copy here may outlive it
+        Person.objects.filter(pk=self.user.pk).update(is_premium=True)
+        with self.assertNumQueries(1):
+            self.assertTrue(people.get(self.user.id).is_premium)
+        self.assertEqual(people.stats()['size'], 0)
+
+    def test_password_hash_is_not_cached(self):
+        people = PersonCache(max_size=10, ttl=60)
+        people.get(self.user.id)
+        person = people.get(self.user.id)
+        self.assertIn('password', person.get_deferred_fields())
+        with self.assertNumQueries(1):
+            self.assertEqual(person.password, self.user.password)
+
+    def test_account_patch_and_set_password_invalidate(self):
+        headers = auth_header(self.user)
+        self.client.get('/api/account/', **headers)
+        self.client.patch('/api/account/', {'is_premium': True}, format='json', **headers)
+        self.assertTrue(self.client.get('/api/account/', **headers).data['is_premium'])
+
+        self.user.refresh_from_db()
+        self.user.set_password('new-password')
+        self.assertEqual(person_cache.get(self.user.id).password, self.user.password)
+
+    def test_account_patch_does_not_write_back_a_stale_cached_user(self):
+        headers = auth_header(self.user)
+        self.client.get('/api/account/', **headers)
+        # Changed behind the cache's back, e.g. by another process
+        Person.objects.filter(pk=self.user.pk).update(income=4321)
+        self.client.patch('/api/account/', {'is_premium': True}, format='json', **headers)
+        self.assertEqual(
+            Person.objects.values_list('income', 'is_premium').get(pk=self.user.pk), (4321, True)
+        )
+
+
+class TransactionImportTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_premium = True
+        self.user.save()
+        CategoryLimit.objects.create(user=self.user, category=self.categories[0], limit_amount=100)
+
+    def test_json_import_is_constant_in_queries(self):
+        rows = [
+            {'amount': 10, 'category': self.categories[i % 2].id, 'description': f'row {i}'}
+            for i in range(50)
+        ]
+        rows.append({'amount': 500, 'is_income': True})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                '/api/transactions/import/', {'user': self.user.id, 'transactions': rows}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['imported'], 51)
+        # Lookups, one INSERT per chunk, one rollup upsert and ledger update per
+        # affected category and the ledger locks of a month's first write; never per row
+        self.assertLessEqual(len(ctx.captured_queries), 27)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 51)
+        check, = response.data['limit_checks']
+        self.assertEqual((check['category'], check['total_spent'], check['exceeded']), (self.categories[0].id, 250, True))
+        self.assertEqual(rollups.category_spent(self.user, self.categories[1].id), 250)
+
+    def test_csv_import(self):
+        csv_file = SimpleUploadedFile(
+            'statement.csv',
+            b'amount,description,is_income,category_name\n'
+            b'1200,Salary,true,\n'
+            b'35,Lunch,false,category 1\n',
+            content_type='text/csv',
+        )
+        response = self.client.post('/api/transactions/import/', {'user': self.user.id, 'file': csv_file})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('amount', 'is_income', 'category_id')),
+            [(35, False, self.categories[1].id), (1200, True, None)],
+        )
+
+    def test_invalid_rows_import_nothing(self):
+        response = self.client.post('/api/transactions/import/?user=%d' % self.user.id, [
+            {'amount': 10},
+            {'amount': 'ten'},
+            {'amount': 5, 'category': 999999},
+            {'amount': 10 ** 20},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.data['rows']), [1, 2, 3])
+        self.assertFalse(Transaction.objects.exists())
+
+
+class TransactionExportTests(QueryBudgetTestCase):
+
+    def test_csv_export_uses_history_filters(self):
+        self.add_transactions(6)
+        response = self.client.get('/api/history/export/', {
+            'user_id': self.user.id, 'category_id': self.categories[0].id,
+        })
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,date,amount,is_income,category,category_name,description')
+        self.assertEqual([line.split(',')[2] for line in lines[1:]], ['100', '105'])
+
+    def test_ndjson_export_matches_history(self):
+        self.add_transactions(3)
+        response = self.client.get('/api/history/export/', {'user_id': self.user.id, 'type': 'ndjson'})
+        exported = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        history = self.client.get('/api/history/', {'user_id': self.user.id}).data['data']
+        self.assertEqual(
+            sorted((row['id'], row['date'], row['category_name']) for row in exported),
+            sorted((row['id'], row['date'], row['category_name']) for row in history),
+        )
+
+
+class DescriptionSearchTests(QueryBudgetTestCase):
+
+    def search(self, text):
+        response = self.client.get('/api/history/', {'user_id': self.user.id, 'description': text})
+        return sorted(row['description'] for row in response.data['data'])
+
+    def test_prefix_search_follows_create_update_delete(self):
+        salary = Transaction.objects.create(user=self.user, amount=1, description='Monthly salary')
+        lunch = Transaction.objects.create(user=self.user, amount=2, description='Lunch at the café')
+        Transaction.objects.create(user=self.user, amount=3, description='Salad bar')
+
+        self.assertEqual(self.search('sal'), ['Monthly salary', 'Salad bar'])
+        self.assertEqual(self.search('monthly sal'), ['Monthly salary'])
+        self.assertEqual(self.search('cafe'), ['Lunch at the café'])
+
+        self.client.patch(f'/api/transactions/{lunch.id}/', {'description': 'Dinner'}, format='json')
+        self.assertEqual(self.search('lunch'), [])
+        self.assertEqual(self.search('dinn'), ['Dinner'])
+
+        salary.delete()
+        self.assertEqual(self.search('sal'), ['Salad bar'])
+
+    def test_bulk_created_rows_are_searchable(self):
+        self.add_transactions(3)
+        self.assertEqual(self.search('transaction 2'), ['Transaction 2'])
+
+
+class ContributionRunTests(QueryBudgetTestCase):
+
+    def make_goal(self, user, **kwargs):
+        values = {'name': 'Goal', 'target_amount': 1000, 'monthly_contribution': 100}
+        values.update(kwargs)
+        return SavingsGoal.objects.create(user=user, **values)
+
+    def test_command_is_idempotent_and_respects_balance_rule(self):
+        self.user.income = 3000
+        self.user.save()
+        poor = Person.objects.create(username='poor', name='Poor', email='poor@example.com', password='x')
+        goal = self.make_goal(self.user, category=self.categories[0])
+        almost = self.make_goal(self.user, current_amount=950)
+        skipped = self.make_goal(poor)
+
+        call_command('process_contributions', chunk_size=1, stdout=io.StringIO())
+        call_command('process_contributions', chunk_size=1, stdout=io.StringIO())
+
+        goal.refresh_from_db()
+        almost.refresh_from_db()
+        skipped.refresh_from_db()
+        self.assertEqual((goal.current_amount, goal.last_contribution_date), (100, timezone.localdate()))
+        self.assertEqual((almost.current_amount, almost.status), (1000, 'completed'))
+        self.assertEqual(skipped.current_amount, 0)
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('amount', 'category_id')),
+            [(50, None), (100, self.categories[0].id)],
+        )
+        self.assertEqual(rollups.category_spent(self.user, self.categories[0].id), 100)
+
+    def test_view_contributes_once_per_month(self):
+        self.user.income = 3000
+        self.user.is_premium = True
+        self.user.save()
+        self.make_goal(self.user)
+        url = '/api/savings-goals/process-contributions/'
+        first = self.client.post(url, **auth_header(self.user))
+        second = self.client.post(url, **auth_header(self.user))
+        self.assertEqual(first.data['total_contributed'], 100)
+        self.assertEqual(second.data['total_contributed'], 0)
+
+
+class ContributionPoolTests(TransactionTestCase):
+    """Worker threads open their own connections, so the rows must be committed"""
+
+    def test_thread_pool_contributes_once_per_goal(self):
+        goals = []
+        for i in range(6):
+            user = Person.objects.create(
+                username=f'saver{i}', name=f'Saver {i}', email=f'saver{i}@example.com', password='x', income=3000
+            )
+            category = Category.objects.create(name='Savings', user=user)
+            for j in range(i % 3 + 1):
+                goals.append(SavingsGoal.objects.create(
+                    user=user, category=category, name=f'Goal {j}', target_amount=1000, monthly_contribution=100,
+                ))
+
+        out = io.StringIO()
+        call_command('process_contributions', workers=2, pool='thread', chunk_size=2, stdout=out)
+        call_command('process_contributions', workers=2, pool='thread', chunk_size=2, stdout=io.StringIO())
+
+        for goal in goals:
+            goal.refresh_from_db()
+            self.assertEqual((goal.current_amount, goal.last_contribution_date), (100, timezone.localdate()))
+        # One expense per goal contribution, none from the second run
+        self.assertEqual(Transaction.objects.filter(amount=100).count(), len(goals))
+
+        shards = [tuple(map(int, row)) for row in re.findall(r'shard \d+: (\d+) goals of (\d+) users', out.getvalue())]
+        total = re.search(r'to (\d+) goals of (\d+) users', out.getvalue()).groups()
+        self.assertEqual(len(shards), 2)
+        self.assertEqual(
+            (sum(goals for goals, _ in shards), sum(users for _, users in shards)), (len(goals), 6)
+        )
+        self.assertEqual(tuple(map(int, total)), (len(goals), 6))
+
+
+class BalanceLedgerTests(QueryBudgetTestCase):
+
+    def ledger(self):
+        return Person.objects.values_list('month_extra_income', 'month_expenses').get(pk=self.user.pk)
+
+    def test_ledger_follows_transaction_writes(self):
+        self.user.income = 1000
+        self.user.save()
+        self.client.post('/api/createTransaction/', {'user': self.user.id, 'amount': 300, 'is_income': True}, format='json')
+        self.client.post('/api/createTransaction/', {'user': self.user.id, 'amount': 120}, format='json')
+        self.add_transactions(2)
+        self.assertEqual(self.ledger(), (300, 120 + 100 + 101))
+
+        expense = Transaction.objects.get(amount=120)
+        self.client.patch(f'/api/transactions/{expense.id}/', {'amount': 20}, format='json')
+        self.client.delete(f'/api/transactions/{Transaction.objects.get(amount=101).id}/')
+        self.assertEqual(self.ledger(), (300, 20 + 100))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(calculate_current_balance(self.user), 1000 + 300 - 120)
+
+    def test_delta_survives_a_concurrent_month_reset(self):
+        month = rollups.current_month_key()
+        fired = []
+
+        def other_writer_resets_first(execute, sql, params, many, context):
+            # After our ledger update missed, another writer moves the ledger to
+            # this month with totals that can't contain our uncommitted delta
+            if not fired and sql.startswith('SELECT'):
+                fired.append(sql)
+                Person.objects.filter(pk=self.user.pk).update(balance_month=month, month_expenses=7)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(other_writer_resets_first):
+            rollups.apply_delta(self.user.id, self.categories[0].id, month, False, 100, 1)
+        self.assertTrue(fired)
+        self.assertEqual(self.ledger(), (0, 107))
+
+    def test_stale_instance_does_not_overwrite_ledger(self):
+        stale = Person.objects.get(pk=self.user.pk)
+        self.add_transactions(1)
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertEqual(self.ledger(), (0, 100))
+
+    def test_reconcile_repairs_wrong_ledger(self):
+        self.add_transactions(3)
+        Person.objects.filter(pk=self.user.pk).update(month_expenses=1)
+        out = io.StringIO()
+        call_command('reconcile_balances', '--repair', stdout=out)
+        self.assertIn('1 wrong', out.getvalue())
+        self.assertEqual(self.ledger(), (0, 100 + 101 + 102))
+
+
+class ResponseCacheTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_premium = True
+        self.user.save()
+        self.headers = auth_header(self.user)
+
+    def test_unchanged_list_revalidates_without_queries(self):
+        url = f'/api/transactions/?user_id={self.user.id}'
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.client.post('/api/createTransaction/', {'user': self.user.id, 'amount': 40}, format='json')
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.data), 1)
+
+    def test_wildcard_if_none_match_is_not_a_match(self):
+        url = f'/api/transactions/?user_id={self.user.id}'
+        self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 200)
+        self.assertEqual(self.client.get('/api/transactions/?user_id=999999', HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+    def test_category_change_invalidates_dependent_lists(self):
+        CategoryLimit.objects.create(user=self.user, category=self.categories[0], limit_amount=100)
+        limits = self.client.get('/api/category-limits/', **self.headers)
+        categories = self.client.get(f'/api/getCategories/?user_id={self.user.id}')
+        goals = self.client.get('/api/savings-goals/', **self.headers)
+
+        self.categories[0].name = 'Renamed'
+        self.categories[0].save()
+        self.assertEqual(
+            self.client.get('/api/category-limits/', HTTP_IF_NONE_MATCH=limits['ETag'], **self.headers).data[0]['category_name'],
+            'Renamed',
+        )
+        self.assertEqual(
+            self.client.get(f'/api/getCategories/?user_id={self.user.id}', HTTP_IF_NONE_MATCH=categories['ETag']).status_code,
+            200,
+        )
+        SavingsGoal.objects.create(user=self.user, name='Goal', target_amount=1000, monthly_contribution=100)
+        self.assertEqual(
+            len(self.client.get('/api/savings-goals/', HTTP_IF_NONE_MATCH=goals['ETag'], **self.headers).data), 1
+        )
+
+    def test_bulk_import_invalidates(self):
+        url = f'/api/transactions/?user_id={self.user.id}'
+        before = self.client.get(url)
+        self.client.post(
+            '/api/transactions/import/', {'user': self.user.id, 'transactions': [{'amount': 5}]}, format='json'
+        )
+        after = self.client.get(url, HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual((after.status_code, len(after.data)), (200, 1))
+
+    def test_process_local_backend_is_not_used_unless_allowed(self):
+        url = f'/api/transactions/?user_id={self.user.id}'
+        with override_settings(RESPONSE_CACHE={'ALLOW_PROCESS_LOCAL': False}):
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertNotIn('ETag', response)
+        self.assertTrue(queries.captured_queries)
+
+    def test_rollup_rebuilds_invalidate(self):
+        CategoryLimit.objects.create(user=self.user, category=self.categories[0], limit_amount=100)
+        self.add_transactions(1)
+        # Rows written without signals, as a restore or manual fix would
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, category=self.categories[0], amount=50, date=timezone.localdate())
+        ])
+        for command in (['rebuild_monthly_totals'], ['reconcile_balances', '--repair']):
+            Person.objects.filter(pk=self.user.pk).update(balance_month=rollups.current_month_key(), month_expenses=1)
+            before = self.client.get('/api/category-limits/', **self.headers)
+            call_command(*command, stdout=io.StringIO())
+            after = self.client.get('/api/category-limits/', HTTP_IF_NONE_MATCH=before['ETag'], **self.headers)
+            self.assertEqual(after.status_code, 200, command)
+
+
+class FastJSONTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_premium = True
+        self.user.save()
+        self.add_transactions(5)
+        Transaction.objects.create(user=self.user, amount=7, description='Uncategorised   café')
+        CategoryLimit.objects.create(user=self.user, category=self.categories[0], limit_amount=100)
+        SavingsGoal.objects.create(
+            user=self.user, name='Trip', target_amount=900, monthly_contribution=100,
+            current_amount=300, deadline=timezone.localdate().replace(year=timezone.localdate().year + 1),
+        )
+
+    def render_both(self, url, **headers):
+        with self.settings(FAST_JSON_LISTS=False, REST_FRAMEWORK={}):
+            cache.clear()
+            slow = self.client.get(url, **headers).content
+        cache.clear()
+        return slow, self.client.get(url, **headers).content
+
+    def test_same_bytes_as_serializers(self):
+        for url, headers in [
+            (f'/api/transactions/?user_id={self.user.id}', {}),
+            ('/api/savings-goals/', auth_header(self.user)),
+            ('/api/category-limits/', auth_header(self.user)),
+        ]:
+            slow, fast = self.render_both(url, **headers)
+            self.assertEqual(fast, slow, url)
+
+
+class TransactionSummaryTests(QueryBudgetTestCase):
+
+    def test_summary_matches_transactions(self):
+        url = f'/api/transactions/summary/?user_id={self.user.id}'
+        self.add_transactions(7)
+        Transaction.objects.create(user=self.user, amount=500, is_income=True)
+        cache.clear()
+        # Person lookup and one grouped query over the rollup
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        self.assertEqual(response.data['income'], {'total': 500, 'count': 1})
+        self.assertEqual(response.data['expenses'], {'total': sum(100 + i for i in range(7)), 'count': 7})
+        # Expenses first, largest category first
+        first = response.data['categories'][0]
+        self.assertEqual(
+            (first['category'], first['category_name'], first['total'], first['count']),
+            (self.categories[1].id, 'Category 1', 101 + 106, 2),
+        )
+        self.assertEqual(response.data['categories'][-1]['category_name'], "No category")
+
+        Transaction.objects.filter(category=self.categories[0]).delete()
+        names = [row['category_name'] for row in self.client.get(url).data['categories']]
+        self.assertNotIn('Category 0', names)
+
+    def test_period_parameters(self):
+        self.add_transactions(1)
+        now = timezone.localtime()
+        this_year = self.client.get(f'/api/transactions/summary/?user_id={self.user.id}&year={now.year}')
+        last_year = self.client.get(f'/api/transactions/summary/?user_id={self.user.id}&year={now.year - 1}')
+        self.assertEqual(this_year.data['expenses']['count'], 1)
+        self.assertEqual(last_year.data['categories'], [])
+        self.assertEqual(
+            self.client.get(f'/api/transactions/summary/?user_id={self.user.id}&date=x').status_code, 400
+        )
+
+
+@skipUnless(analytics.available(), "numpy is not installed")
+class TransactionAnalyticsTests(QueryBudgetTestCase):
+
+    def add_transaction(self, day, amount, category=None, is_income=False):
+        transaction = Transaction.objects.create(
+            user=self.user, amount=amount, category=category, is_income=is_income
+        )
+        Transaction.objects.filter(pk=transaction.pk).update(
+            date=datetime.combine(day, time(12), tzinfo=timezone.get_current_timezone())
+        )
+
+    def test_series_and_percentiles(self):
+        self.add_transaction(date(2024, 1, 1), 100, self.categories[0])
+        self.add_transaction(date(2024, 1, 3), 300, self.categories[0])
+        self.add_transaction(date(2024, 1, 8), 50, self.categories[1])
+        self.add_transaction(date(2024, 2, 5), 900, self.categories[0])
+        self.add_transaction(date(2024, 2, 6), 1000, is_income=True)
+        url = f'/api/transactions/analytics/?user_id={self.user.id}&date_from=2024-01-01&date_to=2024-02-29&window=3'
+        # Person lookup, the bulk column load and the category names
+        with self.assertNumQueries(3):
+            data = self.client.get(url).data
+
+        self.assertEqual(data['transactions'], 5)
+        self.assertEqual(len(data['daily']['dates']), 60)
+        self.assertEqual(data['daily']['expenses'][:3], [100, 0, 300])
+        self.assertEqual(data['daily']['rolling_expenses'][:3], [None, None, round(400 / 3, 2)])
+        # 2024-01-01 was a Monday
+        self.assertEqual(data['weekly']['weeks'][:2], ['2024-01-01', '2024-01-08'])
+        self.assertEqual(data['weekly']['expenses'][:2], [400, 50])
+        self.assertEqual(data['monthly']['months'], ['2024-01', '2024-02'])
+        self.assertEqual(data['monthly']['income'], [0, 1000])
+        self.assertEqual(data['monthly']['expense_change'], [None, 450])
+        self.assertEqual(data['monthly']['expense_change_pct'], [None, 100.0])
+
+        top = data['categories'][0]
+        self.assertEqual(
+            (top['category'], top['category_name'], top['count'], top['total'], top['p50']),
+            (self.categories[0].id, 'Category 0', 3, 1300, 300.0),
+        )
+
+    def test_invalid_period(self):
+        url = f'/api/transactions/analytics/?user_id={self.user.id}&date_from=2024-02-01&date_to=2024-01-01'
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url.replace('2024-02-01', 'soon')).status_code, 400)
+
+    def test_period_ending_on_the_last_representable_day(self):
+        url = f'/api/transactions/analytics/?user_id={self.user.id}&date_from=9999-12-01&date_to=9999-12-31'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['daily']['dates']), 31)
+
+
+class ProfilingMiddlewareTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        request_metrics.reset()
+
+    def test_records_per_endpoint_timings_and_queries(self):
+        self.add_transactions(3)
+        for _ in range(2):
+            cache.clear()
+            self.client.get(f'/api/transactions/?user_id={self.user.id}')
+        self.client.get(f'/api/transactions/{Transaction.objects.first().id}/')
+
+        with self.settings(PROFILING={'METRICS_TOKEN': 'secret'}):
+            endpoints = self.client.get('/api/metrics/', HTTP_X_METRICS_TOKEN='secret').data['endpoints']
+        listing = endpoints['GET /api/transactions/']
+        self.assertEqual(listing['requests'], 2)
+        self.assertEqual(listing['avg_queries'], 2)
+        self.assertGreater(listing['avg_render_ms'], 0)
+        self.assertEqual(sum(listing['histogram'].values()), 2)
+        self.assertIn('GET /api/transactions/<int:pk>/', endpoints)
+
+    def test_sampled_profiles(self):
+        with self.settings(PROFILING={'SAMPLE_RATE': 1.0, 'TOP_FUNCTIONS': 5}):
+            self.client.get(f'/api/getCategories/?user_id={self.user.id}')
+        profile, = request_metrics.snapshot()['profiles']
+        self.assertEqual(profile['endpoint'], 'GET /api/getCategories/')
+        self.assertIn('cumulative', profile['report'])
+
+    def test_metrics_require_the_token_outside_debug(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        with self.settings(PROFILING={'METRICS_TOKEN': 'secret'}):
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_X_METRICS_TOKEN='wrong').status_code, 403)
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_X_METRICS_TOKEN='secret').status_code, 200)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 200)
+
+
+class BenchmarkSuiteTests(TestCase):
+
+    def test_generate_and_compare_against_baseline(self):
+        ids = benchdata.generate({'users': 3, 'transactions': 20, 'goals': 1, 'limits': 1}, seed=1, force=True)
+        self.assertEqual(Transaction.objects.filter(user_id__in=ids).count(), 60)
+        self.assertEqual(
+            MonthlyCategoryTotal.objects.filter(user_id__in=ids).aggregate(n=Sum('count'))['n'], 60
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            options = {
+                'scenarios': ['dashboard', 'create_transaction', 'history_search'], 'requests': 3,
+                'users': 3, 'transactions': 20, 'baseline': baseline, 'stdout': io.StringIO(), 'force': True,
+            }
+            call_command('run_benchmarks', write_baseline=True, **options)
+            with open(baseline) as f:
+                self.assertEqual(json.load(f)['scenarios']['history_search']['max_queries'], 1)
+            out = io.StringIO()
+            call_command('run_benchmarks', **{**options, 'stdout': out})
+            self.assertIn('history_search', out.getvalue().split('p95 base')[1])
+        self.assertFalse(Person.objects.filter(id__in=ids).exists())
+
+    def test_refuses_databases_not_marked_for_benchmarks(self):
+        existing = Person.objects.create(username=f'{benchdata.PREFIX}someone', name='Someone', password='x')
+        lookalike = Person.objects.create(username='bench_press', name='Real', email='press@example.com', password='x')
+        with self.settings(BENCHMARK_DATABASE=False):
+            with self.assertRaises(benchdata.NotABenchDatabase):
+                benchdata.clear()
+            for command in ('run_benchmarks', 'bench_asgi', 'bench_login'):
+                with self.assertRaises(CommandError):
+                    call_command(command, stdout=io.StringIO())
+        self.assertTrue(Person.objects.filter(pk=existing.pk).exists())
+
+        with self.settings(BENCHMARK_DATABASE=True):
+            benchdata.clear()
+        self.assertFalse(Person.objects.filter(pk=existing.pk).exists())
+        self.assertTrue(Person.objects.filter(pk=lookalike.pk).exists())
+
+    def test_generated_username_prefix_cannot_be_registered(self):
+        response = APIClient().post('/api/register/', {
+            'username': f'{benchdata.PREFIX}00001', 'name': 'Sneaky', 'email': 'sneaky@example.com',
+            'password': 'secret-pass', 'repassword': 'secret-pass',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Person.objects.filter(email='sneaky@example.com').exists())
+
+
+class AsyncViewTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_premium = True
+        self.user.save()
+        self.add_transactions(4)
+        SavingsGoal.objects.create(user=self.user, name='Trip', target_amount=900, monthly_contribution=100)
+
+    def test_same_bytes_as_sync_views(self):
+        now = timezone.localtime()
+        for sync_url, async_url, headers in [
+            ('/api/account/', '/api/async/account/', auth_header(self.user)),
+            (f'/api/transactions/?user_id={self.user.id}&date={now.month - 1}&year={now.year}',
+             f'/api/async/transactions/?user_id={self.user.id}&date={now.month - 1}&year={now.year}', {}),
+            (f'/api/getCategories/?user_id={self.user.id}', f'/api/async/getCategories/?user_id={self.user.id}', {}),
+            ('/api/savings-goals/', '/api/async/savings-goals/', auth_header(self.user)),
+        ]:
+            expected = self.client.get(sync_url, **headers)
+            # AsyncClient takes plain header names rather than WSGI environ keys
+            async_headers = {key[5:].lower(): value for key, value in headers.items()}
+            response = async_to_sync(AsyncClient().get)(async_url, headers=async_headers)
+            self.assertEqual((response.status_code, response.content), (200, expected.content), async_url)
+
+    def test_errors_and_revalidation(self):
+        client = AsyncClient()
+        get = async_to_sync(client.get)
+        self.assertEqual(get('/api/async/savings-goals/').status_code, 401)
+        self.assertEqual(get('/api/async/transactions/?user_id=999999').status_code, 404)
+        url = f'/api/async/transactions/?user_id={self.user.id}'
+        first = get(url)
+        self.assertEqual(get(url, headers={'if-none-match': first['ETag']}).status_code, 304)
+        self.add_transactions(1)
+        cache.clear()
+        self.assertEqual(len(json.loads(get(url).content)), 5)
+
+
+class DashboardTests(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_premium = True
+        self.user.income = 100_000
+        self.user.save()
+        SavingsGoal.objects.create(
+            user=self.user, name='Trip', target_amount=1000, current_amount=250, monthly_contribution=100
+        )
+        CategoryLimit.objects.create(user=self.user, category=self.categories[0], limit_amount=150)
+
+    def test_matches_the_separate_endpoints(self):
+        self.add_transactions(6)
+        headers = auth_header(self.user)
+        now = timezone.localtime()
+        month = f'date={now.month - 1}&year={now.year}'
+        response = self.client.get(f'/api/dashboard/?{month}', **headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        account = self.client.get('/api/account/', **headers).json()
+        self.assertEqual(data['account'], {**account, 'balance': 100_000 - sum(100 + i for i in range(6))})
+        self.assertEqual(
+            data['transactions'], self.client.get(f'/api/transactions/?user_id={self.user.id}&{month}').json()
+        )
+        self.assertEqual(
+            data['summary'], self.client.get(f'/api/transactions/summary/?user_id={self.user.id}&{month}').json()
+        )
+        self.assertEqual(data['savings_goals'], self.client.get('/api/savings-goals/', **headers).json())
+        self.assertEqual(data['savings_goals'][0]['progress_percentage'], 25.0)
+        self.assertEqual(data['category_limits'], self.client.get('/api/category-limits/', **headers).json())
+        self.assertTrue(data['category_limits'][0]['current_spending']['exceeded'])
+
+        async_data = json.loads(
+            async_to_sync(AsyncClient().get)(
+                f'/api/async/dashboard/?{month}', headers={'authorization': headers['HTTP_AUTHORIZATION']}
+            ).content
+        )
+        self.assertEqual(async_data, data)
+
+    def test_query_budget_and_free_users(self):
+        headers = auth_header(self.user)
+        self.assertQueryBudget(6, lambda: self.client.get('/api/dashboard/', **headers), self.add_transactions)
+
+        self.user.is_premium = False
+        self.user.save()
+        person_cache.clear()
+        data = self.client.get('/api/dashboard/', **headers).json()
+        self.assertEqual((data['savings_goals'], data['category_limits']), ([], []))
+        self.assertEqual(self.client.get('/api/dashboard/?date=13', **headers).status_code, 400)
+        self.assertEqual(self.client.get('/api/dashboard/').status_code, 401)
+
+
+# Cheap Argon2 costs keep the hashing tests fast
+FAST_HASHING = {'POOL_WORKERS': 0, 'ARGON2': {'time_cost': 1, 'memory_cost': 1024, 'parallelism': 1}}
+
+
+@override_settings(PASSWORD_HASHING=FAST_HASHING)
+class PasswordHashingTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Person.objects.create(
+            username='hasher', name='Hasher', email='hasher@example.com',
+            password=make_password('secret-pass', hasher='pbkdf2_sha256'),
+        )
+
+    def tearDown(self):
+        hashing_pool.shutdown()
+
+    def login(self, password='secret-pass'):
+        return self.client.post('/api/login/', {'username': 'hasher', 'password': password}, format='json')
+
+    def test_login_upgrades_old_hashes(self):
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm, 'pbkdf2_sha256')
+
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm, 'argon2')
+        self.assertIn('t=1', self.user.password)
+
+        # Raising the costs upgrades again on the next login
+        with self.settings(PASSWORD_HASHING={**FAST_HASHING, 'ARGON2': {**FAST_HASHING['ARGON2'], 'time_cost': 2}}):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertIn('t=2', self.user.password)
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_pool_verifies_and_turns_away_bursts(self):
+        with self.settings(PASSWORD_HASHING={**FAST_HASHING, 'POOL_WORKERS': 1}):
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.login('wrong').status_code, 401)
+            self.assertEqual(hashing_pool.stats()['jobs'], 2)
+        with self.settings(PASSWORD_HASHING={**FAST_HASHING, 'POOL_WORKERS': 1, 'MAX_PENDING': 0}):
+            response = self.login()
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '1'))
+
+    def test_timed_out_jobs_stay_pending_until_they_finish(self):
+        pool_settings = {**FAST_HASHING, 'POOL_WORKERS': 1, 'MAX_PENDING': 1}
+        with self.settings(PASSWORD_HASHING=pool_settings):
+            # Start the worker first so the slow job is running, not cancellable
+            self.assertEqual(self.login().status_code, 200)
+        with self.settings(PASSWORD_HASHING={**pool_settings, 'TIMEOUT': 0.2}):
+            with self.assertRaises(HashingBusy):
+                hashing_pool.run(sleep, 1)
+            self.assertEqual(hashing_pool.stats()['pending'], 1)
+            self.assertEqual(self.login().status_code, 503)
+            sleep(1.5)
+            self.assertEqual(hashing_pool.stats()['pending'], 0)
+        with self.settings(PASSWORD_HASHING=pool_settings):
+            self.assertEqual(self.login().status_code, 200)
+
+
+@override_settings(CLAIMS_USER={'ENABLED': True, 'ALLOW_PROCESS_LOCAL': True}, PASSWORD_HASHING=FAST_HASHING)
+class ClaimsUserTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        person_cache.clear()
+        cache.clear()
+        self.user = Person.objects.create(
+            username='claims', name='Claims User', email='claims@example.com',
+            password=make_password('secret-pass'), is_premium=True, income=1234,
+        )
+        SavingsGoal.objects.create(user=self.user, name='Bike', target_amount=500, monthly_contribution=50)
+
+    def login(self):
+        response = self.client.post(
+            '/api/login/', {'username': 'claims', 'password': 'secret-pass'}, format='json'
+        )
+        return {'HTTP_AUTHORIZATION': f"Bearer {response.data['access']}"}
+
+    def person_queries(self, headers, url='/api/savings-goals/'):
+        person_cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, **headers)
+        return response, [q['sql'] for q in ctx.captured_queries if 'api_person' in q['sql']]
+
+    def test_premium_views_authorize_from_claims(self):
+        headers = self.login()
+        # The first request caches the version, later ones never read the Person
+        self.person_queries(headers)
+        response, queries = self.person_queries(headers)
+        self.assertEqual((response.status_code, len(response.data), queries), (200, 1, []))
+        self.assertEqual(self.person_queries(headers, '/api/category-limits/')[1], [])
+
+        # Other views still get the full row
+        self.assertEqual(self.client.get('/api/account/', **headers).data['income'], 1234)
+
+    def test_saving_a_claims_user_writes_only_loaded_changes(self):
+        token = RefreshToken().access_token
+        token['user_id'] = self.user.id
+        token['username'] = self.user.username
+        claims.add_claims(token, self.user)
+        Person.objects.filter(pk=self.user.pk).update(is_premium=False)
+        user = claims.user_from_claims(token)
+
+        with CaptureQueriesContext(connection) as ctx:
+            user.save()
+        self.assertEqual(ctx.captured_queries, [])
+
+        user.income = 99
+        with CaptureQueriesContext(connection) as ctx:
+            user.save()
+        # The row update, then the version bump; no lazy loads
+        sql = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual([statement.split()[0] for statement in sql], ['UPDATE', 'UPDATE'])
+        self.assertFalse(any('is_premium' in statement for statement in sql))
+        self.assertEqual(
+            Person.objects.filter(pk=self.user.pk).values_list('income', 'is_premium', 'email').get(),
+            (99, False, 'claims@example.com'),
+        )
+
+    def test_account_changes_invalidate_claims(self):
+        headers = self.login()
+        self.person_queries(headers)
+        self.client.patch('/api/account/', {'is_premium': False}, format='json', **headers)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.version, 2)
+
+        # The stale token falls back to the row, which is no longer premium
+        response, queries = self.person_queries(headers)
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(queries)
+
+        with self.settings(CLAIMS_USER={'ENABLED': False}):
+            self.assertEqual(self.person_queries(self.login())[0].status_code, 403)
+
+    def test_stale_claims_skip_the_cached_person(self):
+        headers = self.login()
+        person_cache.get(self.user.id)
+        # Downgraded elsewhere: the version moves on, the cached Person doesn't
+        Person.objects.filter(pk=self.user.pk).update(is_premium=False)
+        claims.bump(self.user.id)
+
+        self.assertEqual(self.client.get('/api/savings-goals/', **headers).status_code, 403)
+
+
+class TokenStoreTests(TestCase):
+
+    def test_token_values_are_unique(self):
+        now = timezone.now()
+        Token.objects.create(token='same', user_id=1, created_at=now, expires_at=now)
+        with self.assertRaises(IntegrityError):
+            Token.objects.create(token='same', user_id=2, created_at=now, expires_at=now)
+
+    def test_purge_deletes_expired_and_used_rows_in_batches(self):
+        now = timezone.now()
+        Token.objects.bulk_create(
+            [Token(token=f'expired-{i}', user_id=1, created_at=now, expires_at=now - timedelta(minutes=i + 1),
+                   is_used=i % 2 == 0) for i in range(5)]
+            + [Token(token=f'used-{i}', user_id=1, created_at=now, expires_at=now + timedelta(hours=1),
+                     is_used=True) for i in range(3)]
+            + [Token(token=f'live-{i}', user_id=1, created_at=now, expires_at=now + timedelta(hours=1))
+               for i in range(2)]
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            stats = tokens.purge(batch_size=2, pause=0, now=now)
+        self.assertEqual((stats['expired'], stats['used'], stats['batches']), (5, 3, 5))
+        self.assertEqual(sorted(Token.objects.values_list('token', flat=True)), ['live-0', 'live-1'])
+        for query in ctx.captured_queries:
+            if query['sql'].startswith('SELECT') and 'expires_at' in query['sql']:
+                self.assertIn('token_expires_used_idx', used_indexes(query['sql']))
+
+        # Metrics serve what the purge counted
+        Token.objects.create(token='new', user_id=1, created_at=now, expires_at=now)
+        with self.assertNumQueries(0):
+            table = tokens.table_stats()
+        self.assertEqual((table['rows'], table['last_purge']['deleted']), (2, 8))
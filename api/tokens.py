@@ -0,0 +1,118 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from .models import Token
+
+
+DEFAULTS = {
+    'PURGE_BATCH_SIZE': 1000,        # rows deleted per statement and transaction
+    'PURGE_PAUSE': 0.05,             # seconds between batches, to let other writers in
+    'CACHE_ALIAS': 'default',        # Django cache keeping the last purge's stats, None to skip
+}
+
+LAST_PURGE_KEY = 'tokens:last_purge'
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'TOKEN_STORE', {})}
+
+
+def _delete_in_batches(queryset, batch_size, pause, stats):
+    """
+    Delete the rows of queryset by primary key, batch_size at a time. Every
+    DELETE commits on its own, so no lock is held longer than one batch.
+    """
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('expires_at').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Token.objects.filter(pk__in=ids).delete()[0]
+        stats['batches'] += 1
+        if len(ids) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+def purge(batch_size=None, pause=None, now=None):
+    """
+    Delete expired tokens, then used tokens that have not expired yet, in
+    bounded batches. Both passes walk the (expires_at, is_used) index.
+    Returns the counts, throughput and the size of what is left, which are
+    also kept for /api/metrics/.
+    """
+    options = config()
+    batch_size = batch_size or options['PURGE_BATCH_SIZE']
+    pause = options['PURGE_PAUSE'] if pause is None else pause
+    now = now or timezone.now()
+
+    stats = {'batches': 0}
+    started = time.perf_counter()
+    stats['expired'] = _delete_in_batches(Token.objects.filter(expires_at__lte=now), batch_size, pause, stats)
+    stats['used'] = _delete_in_batches(
+        Token.objects.filter(expires_at__gt=now, is_used=True), batch_size, pause, stats
+    )
+    seconds = time.perf_counter() - started
+    stats.update({
+        'deleted': stats['expired'] + stats['used'],
+        'seconds': round(seconds, 3),
+        'rows_per_second': round((stats['expired'] + stats['used']) / seconds, 1) if seconds else None,
+        'finished_at': timezone.now().isoformat(),
+        # Counted once here, so metrics scrapes never scan the table
+        'rows_left': Token.objects.count(),
+        'bytes': table_bytes(),
+    })
+
+    cache = caches[options['CACHE_ALIAS']] if options['CACHE_ALIAS'] else None
+    if cache is not None:
+        cache.set(LAST_PURGE_KEY, stats, None)
+    return stats
+
+
+def table_bytes():
+    """Data plus index size of the token table, where the database reports it"""
+    table = Token._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(
+                    "SELECT data_length + index_length FROM information_schema.tables "
+                    "WHERE table_schema = DATABASE() AND table_name = %s",
+                    [table],
+                )
+            elif connection.vendor == 'sqlite':
+                # Needs SQLite built with the dbstat virtual table
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [table])
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def count_rows(now=None):
+    """Row counts by state. Each is a COUNT over the whole table, so keep it off request paths"""
+    now = now or timezone.now()
+    return {
+        'rows': Token.objects.count(),
+        'expired': Token.objects.filter(expires_at__lte=now).count(),
+        'used': Token.objects.filter(expires_at__gt=now, is_used=True).count(),
+    }
+
+
+def table_stats():
+    """Table rows and size as of the last purge run, and that run; reads only the cache"""
+    options = config()
+    cache = caches[options['CACHE_ALIAS']] if options['CACHE_ALIAS'] else None
+    last_purge = cache.get(LAST_PURGE_KEY) if cache is not None else None
+    return {
+        'rows': last_purge.get('rows_left') if last_purge else None,
+        'bytes': last_purge.get('bytes') if last_purge else None,
+        'last_purge': last_purge,
+    }
@@ -4,6 +4,7 @@ from .views import (
     LoginView, 
     GetCategoriesView, 
     TransactionCreateView,
+    TransactionImportView,
     account_view,
     category_limit_list,
     category_limit_detail,
@@ -14,7 +15,7 @@ from .views import (
     force_monthly_contributions
 )
 from rest_framework_simplejwt.views import TokenRefreshView
-from . import views
+from . import async_views, views
 from .views import transaction_list
 
 urlpatterns = [
@@ -23,13 +24,26 @@ urlpatterns = [
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("getCategories/", GetCategoriesView.as_view(), name="getCategories"),
     path("createTransaction/", TransactionCreateView.as_view(), name="create_transaction"),
+    path("transactions/import/", TransactionImportView.as_view(), name="import_transactions"),
     path('transactions/', transaction_list, name='transaction-list'),
+    path('transactions/summary/', views.transaction_summary, name='transaction-summary'),
+    path('transactions/analytics/', views.transaction_analytics, name='transaction-analytics'),
     path('createCategory/', views.createCategory, name='createCategory'),
     path('transactions/<int:pk>/', views.transaction_detail, name='transaction-detail'),
     path('account/', account_view, name='account'),
+    path('dashboard/', views.dashboard_view, name='dashboard'),
     path('history/', views.transaction_history, name='transaction-list'),
+    path('history/export/', views.transaction_history_export, name='transaction-history-export'),
+    path('metrics/', views.metrics_view, name='metrics'),
 
     
+    # Native async variants of the dashboard reads, for ASGI deployments
+    path('async/account/', async_views.account_view, name='async-account'),
+    path('async/dashboard/', async_views.dashboard_view, name='async-dashboard'),
+    path('async/transactions/', async_views.transaction_list, name='async-transaction-list'),
+    path('async/getCategories/', async_views.get_categories, name='async-getCategories'),
+    path('async/savings-goals/', async_views.savings_goal_list, name='async-savings-goal-list'),
+
     # Category Limit endpoints
     path('category-limits/', category_limit_list, name='category-limit-list'),
     path('category-limits/<int:pk>/', category_limit_detail, name='category-limit-detail'),
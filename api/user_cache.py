@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import router
+
+from .models import Person
+from .response_cache import shared_cache
+
+
+DEFAULTS = {
+    'MAX_SIZE': 1024,     # entries kept in the per-process LRU
+    'TTL': 30,            # seconds an entry lives in either tier
+    'CACHE_ALIAS': 'default',  # Django cache used as the shared tier, None to disable
+    'ALLOW_PROCESS_LOCAL': False,  # use the LRU and a per-process backend (single process only)
+}
+
+# Never cached: readers of these load them from the row
+UNCACHED_FIELDS = ('password',)
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'PERSON_CACHE', {})}
+
+
+class PersonCache:
+    """
+    Two-tier cache of Person rows keyed by user id: a per-process LRU with TTL
+    in front of a shared Django cache backend. Rows are cached as plain field
+    values and turned into a fresh Person for every caller, so views can
+    modify the instance they get without touching the cache.
+
+    Invalidation can only reach this process' memory and the shared
+    backend, and a stale copy elsewhere would keep authorizing e.g. a
+    downgraded premium account. So the LRU, like a per-process backend such
+    as LocMemCache, is only used with ALLOW_PROCESS_LOCAL (one server
+    process); otherwise only a shared backend caches. The password hash is
+    left out and loaded from the row when read.
+    """
+
+    def __init__(self, max_size=None, ttl=None, cache_alias=None, allow_process_local=None):
+        config = _config()
+        self.max_size = max_size if max_size is not None else config['MAX_SIZE']
+        self.ttl = ttl if ttl is not None else config['TTL']
+        self.cache_alias = cache_alias if cache_alias is not None else config['CACHE_ALIAS']
+        # None follows the setting, which tests and DEBUG switch at runtime
+        self.allow_process_local = allow_process_local
+        self.field_names = [
+            field.attname for field in Person._meta.concrete_fields if field.attname not in UNCACHED_FIELDS
+        ]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _process_local_allowed(self):
+        if self.allow_process_local is not None:
+            return self.allow_process_local
+        return _config()['ALLOW_PROCESS_LOCAL']
+
+    def _shared(self):
+        return shared_cache(self.cache_alias, self._process_local_allowed())
+
+    @staticmethod
+    def _key(user_id):
+        # v2: rows without the password hash
+        return f'person:v2:{user_id}'
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, user_id):
+        """Return a Person for user_id, raising Person.DoesNotExist like Person.objects.get"""
+        user_id = int(user_id)
+        values = self._get_local(user_id)
+        if values is not None:
+            self._count('local_hits')
+            return self._build(values)
+
+        shared = self._shared()
+        if shared is not None:
+            values = shared.get(self._key(user_id))
+            if values is not None:
+                self._count('shared_hits')
+                self._set_local(user_id, values)
+                return self._build(values)
+
+        self._count('misses')
+        person = Person.objects.get(id=user_id)
+        values = tuple(getattr(person, name) for name in self.field_names)
+        self._set_local(user_id, values)
+        if shared is not None:
+            shared.set(self._key(user_id), values, self.ttl)
+        return person
+
+    async def aget(self, user_id):
+        """Async get(): the shared tier and the database are awaited"""
+        user_id = int(user_id)
+        values = self._get_local(user_id)
+        if values is not None:
+            self._count('local_hits')
+            return self._build(values)
+
+        shared = self._shared()
+        if shared is not None:
+            values = await shared.aget(self._key(user_id))
+            if values is not None:
+                self._count('shared_hits')
+                self._set_local(user_id, values)
+                return self._build(values)
+
+        self._count('misses')
+        person = await Person.objects.aget(id=user_id)
+        values = tuple(getattr(person, name) for name in self.field_names)
+        self._set_local(user_id, values)
+        if shared is not None:
+            await shared.aset(self._key(user_id), values, self.ttl)
+        return person
+
+    def invalidate(self, user_id):
+        user_id = int(user_id)
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._stats['invalidations'] += 1
+        shared = self._shared()
+        if shared is not None:
+            shared.delete(self._key(user_id))
+
+    def clear(self):
+        """Drop every entry from this process' LRU (the shared tier expires on its own)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0
+        return stats
+
+    def _get_local(self, user_id):
+        if not self._process_local_allowed():
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, values = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return values
+
+    def _set_local(self, user_id, values):
+        if self.max_size <= 0 or not self._process_local_allowed():
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _build(self, values):
+        return Person.from_db(router.db_for_read(Person), self.field_names, values)
+
+
+person_cache = PersonCache()
@@ -7,11 +7,11 @@ from .serializers import (
     TransactionSerializer, RegisterSerializer, CategorySerializer, 
     PersonSerializer, CategoryLimitSerializer, SavingsGoalSerializer
 )
-from django.contrib.auth.hashers import make_password, check_password
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import Person, Token, Category, Transaction, CategoryLimit, SavingsGoal
 from datetime import datetime, timedelta, date
 import hashlib
+import logging
 import uuid
 from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
@@ -20,14 +20,23 @@ from rest_framework import status
 from .models import Transaction
 from .serializers import TransactionSerializer
 from rest_framework.permissions import IsAuthenticated
-from .authentication import CustomJWTAuthentication
+from .authentication import ClaimsJWTAuthentication, CustomJWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from django.db.models import Sum, F
+from django.db import transaction as db_transaction
+from . import analytics, claims, contributions, exports, fast_json, imports, response_cache, rollups, search, tokens
+from .periods import month_range
+from .pagination import InvalidCursor, get_page_size, paginate_transactions, stream_json_list
+from .db_metrics import connection_metrics
+from .passwords import HashingBusy, hashing_pool, verify_password
+from .profiling import metrics_allowed, request_metrics
+from .user_cache import person_cache
+
+logger = logging.getLogger(__name__)
 
 @api_view(['GET', 'PATCH', 'DELETE'])
 def transaction_detail(request, pk):
     try:
-        transaction = Transaction.objects.get(pk=pk)
+        transaction = Transaction.objects.for_listing().get(pk=pk)
     except Transaction.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
@@ -38,12 +47,14 @@ def transaction_detail(request, pk):
     elif request.method == 'PATCH':
         serializer = TransactionSerializer(transaction, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            with db_transaction.atomic():
+                serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == 'DELETE':
-        transaction.delete()
+        with db_transaction.atomic():
+            transaction.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -58,25 +69,17 @@ class TransactionCreateView(APIView):
 
         serializer = TransactionSerializer(data=data)
         if serializer.is_valid():
-            transaction = serializer.save(user=user)
+            with db_transaction.atomic():
+                transaction = serializer.save(user=user)
             
             # Check if this is an expense and if user has premium and category limit set
             if not transaction.is_income and transaction.category and user.is_premium:
-                # Get the current month's start and end
-                now = timezone.now()
-                month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                
                 # Check if there's a limit for this category
                 try:
                     category_limit = CategoryLimit.objects.get(user=user, category=transaction.category)
                     
-                    # Calculate total spending in this category for current month
-                    total_spent = Transaction.objects.filter(
-                        user=user,
-                        category=transaction.category,
-                        is_income=False,
-                        date__gte=month_start
-                    ).aggregate(total=Sum('amount'))['total'] or 0
+                    # Total spending in this category for current month, from the rollup
+                    total_spent = rollups.category_spent(user, transaction.category_id)
                     
                     # Check if limit is exceeded
                     limit_amount = category_limit.limit_amount
@@ -101,6 +104,45 @@ class TransactionCreateView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class TransactionImportView(APIView):
+    """
+    Bulk import of transactions, either as JSON ({"user": id, "transactions": [...]},
+    or a bare array with ?user=id) or as a multipart CSV upload (fields: user, file).
+    All rows are validated first and either every row is inserted or none.
+    """
+    def post(self, request):
+        if isinstance(request.data, list):
+            user_id = request.query_params.get("user")
+        else:
+            user_id = request.data.get("user")
+        try:
+            user = Person.objects.get(id=user_id)
+        except (Person.DoesNotExist, ValueError, TypeError):
+            return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            if 'file' in request.FILES:
+                rows = imports.parse_csv(request.FILES['file'])
+            elif isinstance(request.data, list):
+                rows = request.data
+            else:
+                rows = request.data.get("transactions")
+            transactions, errors = imports.validate_rows(user, rows)
+        except imports.InvalidImport as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if errors:
+            return Response(
+                {"error": "Some rows are invalid, nothing was imported", "rows": errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        imports.import_transactions(user, transactions)
+        return Response({
+            "imported": len(transactions),
+            "limit_checks": imports.limit_checks(user, transactions),
+        }, status=status.HTTP_201_CREATED)
+
 class RegistrationView(APIView):
     def post(self, request, format=None):
         try:
@@ -121,8 +163,14 @@ class RegistrationView(APIView):
                     {"success": False, "message": error_message},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        except Exception as e:
-            print(f"RRRRRRegistration error: {e}")
+        except HashingBusy:
+            return Response(
+                {"success": False, "message": "The server is busy, please try again"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
+        except Exception:
+            logger.exception("Registration failed")
             return Response(
                 {"success": False, "message": "Internal server error during registration"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -138,8 +186,20 @@ class LoginView(APIView):
         except Person.DoesNotExist:
             return Response({'error': 'Invalid username or password!'}, status=status.HTTP_401_UNAUTHORIZED)
         
-        if not check_password(password, user.password):
+        try:
+            valid, upgraded = verify_password(password, user.password)
+        except HashingBusy:
+            return Response(
+                {'error': 'Too many logins right now, please try again'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
+        if not valid:
             return Response({'error': 'Invalid username or password!'}, status=status.HTTP_401_UNAUTHORIZED)
+        if upgraded:
+            # The hash was made by an older hasher or with older costs
+            user.password = upgraded
+            user.save(update_fields=['password'])
 
         # Create a custom token payload for our Person model
         refresh = RefreshToken()
@@ -150,6 +210,11 @@ class LoginView(APIView):
         access_token['user_id'] = user.id
         access_token['username'] = user.username
 
+        # Claims mode: premium views authorize from the token without loading the Person
+        if claims.enabled():
+            claims.add_claims(refresh, user)
+            claims.add_claims(access_token, user)
+
         return Response({
             'refresh': str(refresh),
             'access': str(access_token),
@@ -161,8 +226,13 @@ class LoginView(APIView):
 
 class GetCategoriesView(APIView):
     def get(self, request, format=None): 
-        print('GET Categories called with params:', request.GET.get('user_id'))  
-        user = Person.objects.get(id=request.GET.get('user_id'))
+        user_id = request.GET.get('user_id')
+        return response_cache.cached(
+            request, user_id, response_cache.CATEGORIES, lambda: self.list_categories(user_id)
+        )
+
+    def list_categories(self, user_id):
+        user = Person.objects.get(id=user_id)
         categories = Category.objects.filter(user=user)
         serializer = CategorySerializer(categories, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -188,8 +258,8 @@ def createCategory(request):
         category = Category.objects.create(name=name, user=user, description=description)
         return Response({"id": category.id, "name": category.name, "description": category.description}, status=status.HTTP_201_CREATED)
 
-    except Exception as e:
-        print("Error creating category:", e)
+    except Exception:
+        logger.exception("Creating a category failed")
         return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -197,40 +267,155 @@ def createCategory(request):
 @api_view(['GET'])
 def transaction_list(request):
     user_id = request.GET.get('user_id')
-    month_index = request.GET.get('date')
     if not user_id:
         return Response({"error": "user_id is required"}, status=400)
 
+    # Streams are not cached, everything else is served per user version
+    if request.GET.get('stream') in ['1', 'true']:
+        return list_transactions(request, user_id)
+    return response_cache.cached(
+        request, user_id, response_cache.TRANSACTIONS, lambda: list_transactions(request, user_id)
+    )
+
+
+def list_transactions(request, user_id):
+    month_index = request.GET.get('date')
+    year = request.GET.get('year')
     try:
         user = Person.objects.get(id=user_id)
     except Person.DoesNotExist:
         return Response({"error": "User not found"}, status=404)
 
-    transactions = Transaction.objects.filter(user=user)
+    transactions = Transaction.objects.for_listing().filter(user=user)
 
     if month_index is not None:
+        # date is a 0-based month index; year defaults to the current year.
+        # Filter on a half-open range so the date index can be used.
         try:
             month = int(month_index) + 1
-            transactions = transactions.filter(date__month=month)
+            year = int(year) if year else timezone.localtime().year
+            month_start, month_end = month_range(year, month)
         except ValueError:
             return Response({"error": "Invalid date parameter"}, status=400)
+        transactions = transactions.filter(date__gte=month_start, date__lt=month_end)
+
 
+    # Streaming mode: walk the queryset with a server-side iterator
+    if request.GET.get('stream') in ['1', 'true']:
+        return stream_json_list(transactions.order_by('-date', '-id'), TransactionSerializer)
 
-    transactions = transactions.order_by('-date')
-    serializer = TransactionSerializer(transactions, many=True)
-    return Response(serializer.data)
+    # Cursor mode: keyset pagination over (date, id)
+    cursor = request.GET.get('cursor')
+    raw_page_size = request.GET.get('page_size')
+    if cursor is not None or raw_page_size is not None:
+        try:
+            page_size = get_page_size(raw_page_size)
+        except ValueError:
+            return Response({"error": "Invalid page_size parameter"}, status=400)
+        try:
+            page, next_cursor = paginate_transactions(transactions, cursor, page_size)
+        except InvalidCursor:
+            return Response({"error": "Invalid cursor parameter"}, status=400)
+        serializer = TransactionSerializer(page, many=True)
+        return Response({'results': serializer.data, 'next_cursor': next_cursor})
+
+    return Response(transaction_data(transactions.order_by('-date')))
+
+
+def transaction_data(transactions):
+    if fast_json.enabled():
+        return fast_json.transaction_rows(transactions)
+    return TransactionSerializer(transactions, many=True).data
 
 
 @api_view(['GET'])
-def transaction_history(request):
+def transaction_summary(request):
+    """
+    Per-category totals for the pie charts. date (0-based month) and year
+    select a month, year alone the whole year; the current month by default.
+    """
+    user_id = request.GET.get('user_id')
+    if not user_id:
+        return Response({"error": "user_id is required"}, status=400)
+    return response_cache.cached(
+        request, user_id, response_cache.TRANSACTIONS, lambda: summarize_transactions(request, user_id)
+    )
+
+
+def summarize_transactions(request, user_id):
+    month_index = request.GET.get('date')
+    year = request.GET.get('year')
+    try:
+        user = Person.objects.get(id=user_id)
+    except Person.DoesNotExist:
+        return Response({"error": "User not found"}, status=404)
+
+    try:
+        now = timezone.localtime()
+        if month_index is None and year:
+            start, _ = month_range(int(year), 1)
+            end, _ = month_range(int(year) + 1, 1)
+        elif month_index is not None:
+            start, end = month_range(int(year) if year else now.year, int(month_index) + 1)
+        else:
+            start, end = month_range(now.year, now.month)
+    except ValueError:
+        return Response({"error": "Invalid date parameter"}, status=400)
+
+    summary = rollups.category_summary(user, start.date(), end.date())
+    summary['period'] = {'start': start.date(), 'end': end.date()}
+    return Response(summary)
 
+
+@api_view(['GET'])
+def transaction_analytics(request):
+    """
+    Daily, weekly and monthly series, rolling averages, month-over-month
+    changes and per-category percentiles between date_from and date_to
+    (inclusive, YYYY-MM-DD; the last twelve months by default).
+    """
+    if not analytics.available():
+        return Response({"error": "Analytics requires numpy"}, status=status.HTTP_501_NOT_IMPLEMENTED)
     user_id = request.GET.get('user_id')
-    amount = request.GET.get('amount')
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    description = request.GET.get('description')
-    is_income = request.GET.get('is_income')
-    category_id = request.GET.get('category_id')
+    if not user_id:
+        return Response({"error": "user_id is required"}, status=400)
+    return response_cache.cached(
+        request, user_id, response_cache.TRANSACTIONS, lambda: analyze_transactions(request, user_id)
+    )
+
+
+def analyze_transactions(request, user_id):
+    try:
+        user = Person.objects.get(id=user_id)
+    except Person.DoesNotExist:
+        return Response({"error": "User not found"}, status=404)
+
+    default_from, default_to = analytics.default_period()
+    try:
+        date_from = date.fromisoformat(request.GET['date_from']) if request.GET.get('date_from') else default_from
+        date_to = date.fromisoformat(request.GET['date_to']) if request.GET.get('date_to') else default_to
+        window = int(request.GET.get('window', analytics.DEFAULT_WINDOW))
+        category_id = int(request.GET['category_id']) if request.GET.get('category_id') else None
+    except ValueError:
+        return Response({"error": "Invalid analytics parameter"}, status=400)
+    if date_from > date_to or (date_to - date_from).days >= analytics.MAX_DAYS:
+        return Response(
+            {"error": f"date_from must not be after date_to and the period at most {analytics.MAX_DAYS} days"},
+            status=400,
+        )
+
+    return Response(analytics.analyze(user, date_from, date_to, category_id, window))
+
+
+def filter_transaction_history(params):
+    """Apply the transaction_history query parameters to the user's transactions"""
+    user_id = params.get('user_id')
+    amount = params.get('amount')
+    date_from = params.get('date_from')
+    date_to = params.get('date_to')
+    description = params.get('description')
+    is_income = params.get('is_income')
+    category_id = params.get('category_id')
 
     queryset = Transaction.objects.filter(user_id=user_id)
 
@@ -244,7 +429,7 @@ def transaction_history(request):
         queryset = queryset.filter(date__date__lte=date_to)
 
     if description:
-        queryset = queryset.filter(description__icontains=description)
+        queryset = search.filter_description(queryset, description)
 
     if is_income in ['0', '1']:
         queryset = queryset.filter(is_income=bool(int(is_income)))
@@ -252,9 +437,32 @@ def transaction_history(request):
     if category_id:
         queryset = queryset.filter(category_id=category_id)
 
+    return queryset
+
+
+@api_view(['GET'])
+def transaction_history(request):
+    queryset = filter_transaction_history(request.GET).for_listing()
     serializer = TransactionSerializer(queryset, many=True)
     return Response({'data': serializer.data})
 
+
+@api_view(['GET'])
+def transaction_history_export(request):
+    """
+    Stream the filtered transaction history as CSV (?type=csv, default) or
+    NDJSON (?type=ndjson). Takes the same filters as transaction_history.
+    """
+    if not request.GET.get('user_id'):
+        return Response({"error": "user_id is required"}, status=400)
+
+    export_type = request.GET.get('type', 'csv')
+    if export_type not in exports.EXPORT_TYPES:
+        return Response({"error": "type must be csv or ndjson"}, status=400)
+
+    queryset = filter_transaction_history(request.GET).order_by('date', 'id')
+    return exports.stream_transactions(queryset, export_type)
+
 @api_view(['GET', 'PATCH'])
 def account_view(request):
     """
@@ -300,6 +508,12 @@ def account_view(request):
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     elif request.method == 'PATCH':
+        # The authenticated user may come from the person cache and be stale;
+        # saving it would write its old values back, so update a fresh row
+        try:
+            user = Person.objects.get(pk=user.pk)
+        except Person.DoesNotExist:
+            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         # Use partial=True to allow updating only a subset of fields (like is_premium)
         serializer = PersonSerializer(user, data=request.data, partial=True)
         
@@ -317,7 +531,7 @@ def category_limit_list(request):
     GET: List all category limits for the authenticated user
     POST: Create a new category limit
     """
-    auth = CustomJWTAuthentication()
+    auth = ClaimsJWTAuthentication()
     
     try:
         auth_result = auth.authenticate(request)
@@ -348,36 +562,9 @@ def category_limit_list(request):
         )
     
     if request.method == 'GET':
-        limits = CategoryLimit.objects.filter(user=user)
-        serializer = CategoryLimitSerializer(limits, many=True)
-        
-        # Add spending info for each limit
-        now = timezone.now()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        limits_data = []
-        for limit_data in serializer.data:
-            category_id = limit_data['category']
-            total_spent = Transaction.objects.filter(
-                user=user,
-                category_id=category_id,
-                is_income=False,
-                date__gte=month_start
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            limit_amount = limit_data['limit_amount']
-            percentage = (total_spent / limit_amount) * 100 if limit_amount > 0 else 0
-            
-            limit_data['current_spending'] = {
-                'total_spent': total_spent,
-                'remaining': limit_amount - total_spent,
-                'percentage': round(percentage, 2),
-                'exceeded': total_spent > limit_amount,
-                'warning': percentage >= 80
-            }
-            limits_data.append(limit_data)
-        
-        return Response(limits_data, status=status.HTTP_200_OK)
+        return response_cache.cached(
+            request, user.id, response_cache.CATEGORY_LIMITS, lambda: list_category_limits(user)
+        )
     
     elif request.method == 'POST':
         data = request.data.copy()
@@ -403,6 +590,38 @@ def category_limit_list(request):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def list_category_limits(user):
+    return Response(category_limit_status(user), status=status.HTTP_200_OK)
+
+
+def category_limit_status(user):
+    # Spending for every limit is joined in by the same query
+    limits = rollups.with_category_spent(CategoryLimit.objects.for_listing().filter(user=user))
+    
+    if fast_json.enabled():
+        rows = fast_json.category_limit_rows(limits)
+    else:
+        serializer = CategoryLimitSerializer(limits, many=True)
+        rows = [(limit.total_spent, limit_data) for limit, limit_data in zip(limits, serializer.data)]
+
+    # Add spending info for each limit
+    limits_data = []
+    for total_spent, limit_data in rows:
+        limit_amount = limit_data['limit_amount']
+        percentage = (total_spent / limit_amount) * 100 if limit_amount > 0 else 0
+        
+        limit_data['current_spending'] = {
+            'total_spent': total_spent,
+            'remaining': limit_amount - total_spent,
+            'percentage': round(percentage, 2),
+            'exceeded': total_spent > limit_amount,
+            'warning': percentage >= 80
+        }
+        limits_data.append(limit_data)
+    
+    return limits_data
+
+
 @api_view(['GET', 'PATCH', 'DELETE'])
 def category_limit_detail(request, pk):
     """
@@ -434,7 +653,7 @@ def category_limit_detail(request, pk):
         )
     
     try:
-        limit = CategoryLimit.objects.get(pk=pk, user=user)
+        limit = CategoryLimit.objects.for_listing().get(pk=pk, user=user)
     except CategoryLimit.DoesNotExist:
         return Response(
             {'error': 'Category limit not found'}, 
@@ -494,15 +713,7 @@ def check_category_spending(request, category_id):
         )
     
     # Get current month's spending
-    now = timezone.now()
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    total_spent = Transaction.objects.filter(
-        user=user,
-        category=category,
-        is_income=False,
-        date__gte=month_start
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    total_spent = rollups.category_spent(user, category.id)
     
     # Check if there's a limit
     try:
@@ -534,20 +745,8 @@ def check_category_spending(request, category_id):
 # Helper function to calculate current balance
 def calculate_current_balance(user):
     """Calculate user's current balance for the current month"""
-    current_date = timezone.now()
-    month_start = current_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    # Calculate balance
-    monthly_income = user.income
-    extra_income = Transaction.objects.filter(
-        user=user, is_income=True, date__gte=month_start
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    expenses = Transaction.objects.filter(
-        user=user, is_income=False, date__gte=month_start
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    return monthly_income + extra_income - expenses
+    # Read from the balance ledger kept on Person
+    return rollups.current_balance(user)
 
 
 # Savings Goal Views
@@ -557,7 +756,7 @@ def savings_goal_list(request):
     GET: List all savings goals for the authenticated user
     POST: Create a new savings goal with automatic first contribution
     """
-    auth = CustomJWTAuthentication()
+    auth = ClaimsJWTAuthentication()
     
     try:
         auth_result = auth.authenticate(request)
@@ -588,9 +787,9 @@ def savings_goal_list(request):
         )
     
     if request.method == 'GET':
-        goals = SavingsGoal.objects.filter(user=user).order_by('-created_at')
-        serializer = SavingsGoalSerializer(goals, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return response_cache.cached(
+            request, user.id, response_cache.SAVINGS_GOALS, lambda: list_savings_goals(user)
+        )
     
     elif request.method == 'POST':
         # Check if user already has 3 active goals
@@ -654,16 +853,17 @@ def savings_goal_list(request):
             if goal.current_amount >= goal.target_amount:
                 goal.status = 'completed'
             
-            goal.save()
-            
-            # Create transaction record for the first contribution
-            Transaction.objects.create(
-                user=user,
-                amount=contribution_amount,
-                description=f"Initial contribution to savings goal: {goal.name}",
-                is_income=False,
-                category=category
-            )
+            with db_transaction.atomic():
+                goal.save()
+                
+                # Create transaction record for the first contribution
+                Transaction.objects.create(
+                    user=user,
+                    amount=contribution_amount,
+                    description=f"Initial contribution to savings goal: {goal.name}",
+                    is_income=False,
+                    category=category
+                )
             
             # Return the updated goal
             updated_serializer = SavingsGoalSerializer(goal)
@@ -675,6 +875,17 @@ def savings_goal_list(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def list_savings_goals(user):
+    return Response(savings_goal_data(user), status=status.HTTP_200_OK)
+
+
+def savings_goal_data(user):
+    goals = SavingsGoal.objects.filter(user=user).order_by('-created_at')
+    if fast_json.enabled():
+        return fast_json.savings_goal_rows(goals)
+    return SavingsGoalSerializer(goals, many=True).data
+
+
 @api_view(['GET', 'PATCH', 'DELETE'])
 def savings_goal_detail(request, pk):
     """
@@ -725,13 +936,14 @@ def savings_goal_detail(request, pk):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == 'DELETE':
-        # Delete all transactions associated with this savings goal's category
-        if goal.category:
-            Transaction.objects.filter(user=user, category=goal.category).delete()
-            # Optionally delete the category as well (or keep it for history)
-            # goal.category.delete()
-        
-        goal.delete()
+        with db_transaction.atomic():
+            # Delete all transactions associated with this savings goal's category
+            if goal.category:
+                Transaction.objects.filter(user=user, category=goal.category).delete()
+                # Optionally delete the category as well (or keep it for history)
+                # goal.category.delete()
+            
+            goal.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -741,7 +953,7 @@ def process_monthly_contributions(request):
     Process monthly contributions for all active savings goals
     This should be called by a cron job or management command
     """
-    auth = CustomJWTAuthentication()
+    auth = ClaimsJWTAuthentication()
     
     try:
         auth_result = auth.authenticate(request)
@@ -773,15 +985,9 @@ def process_monthly_contributions(request):
     # Get user's current balance
     current_balance = calculate_current_balance(user)
     
-    # Get active goals that need contribution
-    current_date = timezone.now()
-    active_goals = SavingsGoal.objects.filter(
-        user=user, 
-        status='active',
-        current_amount__lt=F('target_amount')
-    )
+    # Get active goals that need contribution (evaluated once)
+    active_goals = list(contributions.active_goals().filter(user=user))
     
-    results = []
     total_required = sum(goal.monthly_contribution for goal in active_goals)
     
     # Check if monthly contribution is MORE than 1/3 of balance
@@ -797,44 +1003,12 @@ def process_monthly_contributions(request):
             'requires_permission': True
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Process contributions for each goal
-    for goal in active_goals:
-        # Check if already contributed this month
-        if (goal.last_contribution_date and 
-            goal.last_contribution_date.month == current_date.month and
-            goal.last_contribution_date.year == current_date.year):
-            continue
-        
-        # Calculate contribution amount (don't exceed target)
-        remaining_amount = goal.target_amount - goal.current_amount
-        contribution_amount = min(goal.monthly_contribution, remaining_amount)
-        
-        # Update goal
-        goal.current_amount += contribution_amount
-        goal.last_contribution_date = current_date.date()
-        
-        # Mark as completed if target reached
-        if goal.current_amount >= goal.target_amount:
-            goal.status = 'completed'
-        
-        goal.save()
-        
-        # Create transaction record
-        Transaction.objects.create(
-            user=user,
-            amount=contribution_amount,
-            description=f"Automatic contribution to savings goal: {goal.name}",
-            is_income=False,
-            category=goal.category
+    # Process contributions for every goal not yet contributed this month,
+    # locking the goals so a concurrent run can't contribute twice
+    with db_transaction.atomic():
+        results = contributions.contribute(
+            contributions.due_goals().filter(user=user).select_for_update().order_by('id')
         )
-        
-        results.append({
-            'goal_id': goal.id,
-            'goal_name': goal.name,
-            'contribution_amount': contribution_amount,
-            'new_total': goal.current_amount,
-            'completed': goal.status == 'completed'
-        })
     
     return Response({
         'success': True,
@@ -878,58 +1052,98 @@ def force_monthly_contributions(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Get active goals that need contribution
-    current_date = timezone.now()
-    active_goals = SavingsGoal.objects.filter(
-        user=user, 
-        status='active',
-        current_amount__lt=F('target_amount')
-    )
-    
-    results = []
-    
-    # Process contributions for each goal
-    for goal in active_goals:
-        # Check if already contributed this month
-        if (goal.last_contribution_date and 
-            goal.last_contribution_date.month == current_date.month and
-            goal.last_contribution_date.year == current_date.year):
-            continue
-        
-        # Calculate contribution amount (don't exceed target)
-        remaining_amount = goal.target_amount - goal.current_amount
-        contribution_amount = min(goal.monthly_contribution, remaining_amount)
-        
-        # Update goal
-        goal.current_amount += contribution_amount
-        goal.last_contribution_date = current_date.date()
-        
-        # Mark as completed if target reached
-        if goal.current_amount >= goal.target_amount:
-            goal.status = 'completed'
-        
-        goal.save()
-        
-        # Create transaction record
-        Transaction.objects.create(
-            user=user,
-            amount=contribution_amount,
-            description=f"Automatic contribution to savings goal: {goal.name} (forced)",
-            is_income=False,
-            category=None
+    # Process contributions for every goal not yet contributed this month
+    with db_transaction.atomic():
+        results = contributions.contribute(
+            contributions.due_goals().filter(user=user).select_for_update().order_by('id'), forced=True
         )
-        
-        results.append({
-            'goal_id': goal.id,
-            'goal_name': goal.name,
-            'contribution_amount': contribution_amount,
-            'new_total': goal.current_amount,
-            'completed': goal.status == 'completed'
-        })
     
     return Response({
         'success': True,
         'message': f'Successfully processed forced contributions for {len(results)} goals',
         'contributions': results,
         'total_contributed': sum(r['contribution_amount'] for r in results)
-    }, status=status.HTTP_200_OK)
\ No newline at end of file
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def dashboard_view(request):
+    """
+    Everything Main.jsx shows on load in one response: the account with its
+    balance, the month's transactions and category summary, and for premium
+    users the savings goals and category limit status. date (0-based month)
+    and year select the month, the current one by default.
+    """
+    auth = CustomJWTAuthentication()
+
+    try:
+        auth_result = auth.authenticate(request)
+        if auth_result is None:
+            return Response(
+                {'error': 'Authentication credentials were not provided'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        user, token = auth_result
+    except (InvalidToken, TokenError) as e:
+        return Response(
+            {'error': f'Invalid token: {str(e)}'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    try:
+        start, end = dashboard_month(request)
+    except ValueError:
+        return Response({"error": "Invalid date parameter"}, status=400)
+
+    sections = dashboard_sections(user, start, end)
+    return Response({name: build() for name, build in sections.items()}, status=status.HTTP_200_OK)
+
+
+def dashboard_month(request):
+    """Bounds of the month selected by date/year; ValueError for bad input"""
+    month_index = request.GET.get('date')
+    year = request.GET.get('year')
+    now = timezone.localtime()
+    if month_index is None:
+        return month_range(int(year) if year else now.year, now.month)
+    return month_range(int(year) if year else now.year, int(month_index) + 1)
+
+
+def dashboard_sections(user, start, end):
+    """
+    Builders of the dashboard parts for an authenticated user. None depends
+    on another's result, so callers may run them in any order or concurrently.
+    """
+    def account():
+        return {**PersonSerializer(user).data, 'balance': calculate_current_balance(user)}
+
+    def transactions():
+        return transaction_data(
+            Transaction.objects.for_listing().filter(user=user, date__gte=start, date__lt=end).order_by('-date')
+        )
+
+    def summary():
+        month_summary = rollups.category_summary(user, start.date(), end.date())
+        month_summary['period'] = {'start': start.date(), 'end': end.date()}
+        return month_summary
+
+    return {
+        'account': account,
+        'transactions': transactions,
+        'summary': summary,
+        'savings_goals': (lambda: savings_goal_data(user)) if user.is_premium else list,
+        'category_limits': (lambda: category_limit_status(user)) if user.is_premium else list,
+    }
+
+
+@api_view(['GET'])
+def metrics_view(request):
+    """Request timings, connection, cache and hashing pool counters, and token table size at the last purge"""
+    if not metrics_allowed(request):
+        return Response({"error": "Metrics require the metrics token"}, status=status.HTTP_403_FORBIDDEN)
+    metrics = request_metrics.snapshot()
+    metrics['connections'] = connection_metrics.snapshot()
+    metrics['person_cache'] = person_cache.stats()
+    metrics['password_hashing'] = hashing_pool.stats()
+    metrics['tokens'] = tokens.table_stats()
+    return Response(metrics)
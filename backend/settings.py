@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -57,9 +60,16 @@ MIDDLEWARE = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'api.authentication.CustomJWTAuthentication',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.fast_json.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
+# Build list responses from .values() rows instead of ModelSerializers (see api.fast_json)
+FAST_JSON_LISTS = True
+
 
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -93,21 +103,76 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'fintech',
-        'USER': 'fintech_user',
-        'PASSWORD': 'StrongPassword123!',
-        'HOST': '127.0.0.1',   # must be 127.0.0.1, not "localhost"
-        'PORT': '3306',
+# Every value can be overridden from the environment. DB_ENGINE=sqlite runs
+# against a local db.sqlite3 file instead of MySQL.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'mysql')
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Take the write lock when a transaction starts so concurrent
+                # workers wait for each other instead of failing to upgrade
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # A file rather than the in-memory default, whose table locks fail
+            # at once instead of waiting, so tests can run worker threads
+            'TEST': {'NAME': os.environ.get('DB_TEST_NAME', BASE_DIR / 'test_db.sqlite3')},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.environ.get('DB_NAME', 'fintech'),
+            'USER': os.environ.get('DB_USER', 'fintech_user'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', 'StrongPassword123!'),
+            'HOST': os.environ.get('DB_HOST', '127.0.0.1'),   # must be 127.0.0.1, not "localhost"
+            'PORT': os.environ.get('DB_PORT', '3306'),
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
     }
-}
+
+# Persistent connections: each worker thread keeps its connection open for
+# DB_CONN_MAX_AGE seconds (0 closes it after every request, "none" keeps it
+# forever) instead of paying a new TCP + auth handshake per request. Health
+# checks ping a reused connection before a request uses it.
+_conn_max_age = os.environ.get('DB_CONN_MAX_AGE', '60')
+DATABASES['default']['CONN_MAX_AGE'] = None if _conn_max_age.lower() == 'none' else int(_conn_max_age)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1'
+
+# Number of connections the database grants this deployment (one per worker
+# thread with persistent connections). Used for pool saturation metrics.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
 
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# The first hasher hashes new passwords; hashes made by the others (or with
+# other costs) still verify and are replaced on the next login. Argon2 needs
+# argon2-cffi, without it new hashes use scrypt.
+PASSWORD_HASHERS = [
+    *(['api.passwords.TunedArgon2PasswordHasher'] if importlib.util.find_spec('argon2') else []),
+    'api.passwords.TunedScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Hasher costs and the process pool logins verify passwords in (see api.passwords)
+PASSWORD_HASHING = {
+    'POOL_WORKERS': int(os.environ.get('PASSWORD_POOL_WORKERS', '2')),
+    'MAX_PENDING': 16,
+    'TIMEOUT': 10,
+    'ARGON2': {'time_cost': 3, 'memory_cost': 65536, 'parallelism': 4},
+    'SCRYPT': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -145,3 +210,73 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+# Transaction list pagination
+TRANSACTION_PAGE_SIZE = 100
+TRANSACTION_MAX_PAGE_SIZE = 1000
+
+# Bulk transaction import
+TRANSACTION_IMPORT_MAX_ROWS = 10000
+TRANSACTION_IMPORT_BATCH_SIZE = 1000
+
+# Cache of authenticated Person rows (see api.user_cache)
+PERSON_CACHE = {
+    'MAX_SIZE': 1024,
+    'TTL': 30,
+    'CACHE_ALIAS': 'default',
+    # Per-process copies can't be invalidated from other processes
+    'ALLOW_PROCESS_LOCAL': DEBUG,
+}
+
+# Opt-in "claims user" tokens: name, is_premium and the Person version are
+# signed into tokens and the premium views trust them (see api.claims)
+CLAIMS_USER = {
+    'ENABLED': os.environ.get('CLAIMS_USER', '0') == '1',
+    'CACHE_ALIAS': 'default',
+    'VERSION_TTL': 300,
+    'ALLOW_PROCESS_LOCAL': DEBUG,
+}
+
+# Single-use token table: the batches purge_tokens deletes in (see api.tokens)
+TOKEN_STORE = {
+    'PURGE_BATCH_SIZE': 1000,
+    'PURGE_PAUSE': 0.05,
+}
+
+# Request timing middleware and /api/metrics/ (see api.profiling)
+PROFILING = {
+    'ENABLED': True,
+    'SAMPLE_RATE': float(os.environ.get('PROFILING_SAMPLE_RATE', '0')),
+    'KEEP_PROFILES': 20,
+    'TOP_FUNCTIONS': 25,
+    # Outside DEBUG, /api/metrics/ needs this value in the X-Metrics-Token header
+    'METRICS_TOKEN': os.environ.get('METRICS_TOKEN'),
+}
+
+# Per-user cache of read endpoint responses with ETags (see api.response_cache)
+RESPONSE_CACHE = {
+    'TTL': 300,
+    'CACHE_ALIAS': 'default',
+    # The local memory cache is per process, so it is only used by the single-process dev server
+    'ALLOW_PROCESS_LOCAL': DEBUG,
+}
+
+# Response and claim versions must be seen by every server process: point REDIS_URL
+# at a Redis server (needs the redis package) when running more than one
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Set BENCH_DATABASE=1 only for a database that exists for benchmarks: the
+# benchmark commands generate and delete bench_* users (see api.benchdata)
+BENCHMARK_DATABASE = os.environ.get('BENCH_DATABASE', '0') == '1'
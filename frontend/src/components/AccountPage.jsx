@@ -13,7 +13,7 @@ function AccountPage() {
     const [loading, setLoading] = useState(true);
     const [updating, setUpdating] = useState(false);
     const [error, setError] = useState(null);
-    const [transactions, setTransactions] = useState([]);
+    const [summary, setSummary] = useState(null);
     const [loadingTransactions, setLoadingTransactions] = useState(true);
     const [editingIncome, setEditingIncome] = useState(false);
     const [newIncome, setNewIncome] = useState('');
@@ -67,23 +67,23 @@ function AccountPage() {
         }
     }, [logout]);
 
-    // Fetch transactions to calculate balance
+    // Fetch this month's totals to calculate balance
     useEffect(() => {
         if (!user) return;
-        const fetchTransactions = async () => {
+        const fetchSummary = async () => {
             try {
                 const current = new Date();
-                const res = await fetch(`${apiUrl}api/transactions/?user_id=${user.id}&date=${current.getMonth()}`);
-                if (!res.ok) throw new Error("Failed to fetch transactions");
+                const res = await fetch(`${apiUrl}api/transactions/summary/?user_id=${user.id}&date=${current.getMonth()}&year=${current.getFullYear()}`);
+                if (!res.ok) throw new Error("Failed to fetch transaction summary");
                 const data = await res.json();
-                setTransactions(data);
+                setSummary(data);
             } catch (err) {
                 console.error(err);
             } finally {
                 setLoadingTransactions(false);
             }
         };
-        fetchTransactions();
+        fetchSummary();
     }, [user]);
 
     useEffect(() => {
@@ -226,12 +226,8 @@ function AccountPage() {
 
     // Calculate balance components
     const monthlyIncome = account?.income || 0;
-    const extraIncome = transactions
-        .filter(tx => tx.is_income)
-        .reduce((sum, tx) => sum + tx.amount, 0);
-    const expenses = transactions
-        .filter(tx => !tx.is_income)
-        .reduce((sum, tx) => sum + tx.amount, 0);
+    const extraIncome = summary?.income.total || 0;
+    const expenses = summary?.expenses.total || 0;
     const totalIncome = monthlyIncome + extraIncome;
     const balance = totalIncome - expenses;
 
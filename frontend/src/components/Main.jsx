@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useAuth } from "./context/AuthContext";
 import Layout from "./Layout";
 import TransactionPieChart from "./PieChart";
@@ -14,12 +14,14 @@ function Main() {
 
     const { user } = useAuth();
     const [transactions, setTransactions] = useState([]);
+    const [categorySummary, setCategorySummary] = useState([]);
     const [loadingTransactions, setLoadingTransactions] = useState(true);
     const [account, setAccount] = useState(null);
     const [loadingAccount, setLoadingAccount] = useState(true);
     const [savingsGoals, setSavingsGoals] = useState([]);
     const [allSavingsGoalNames, setAllSavingsGoalNames] = useState([]);
     const [loadingSavingsGoals, setLoadingSavingsGoals] = useState(true);
+    const summaryLoaded = useRef(false);
 
     const [extraIncome, setExtraIncome] = useState(0);
     const [negAmount, setNegAmount] = useState(0);
@@ -57,90 +59,63 @@ function Main() {
         setShowTransaction(true);
     };
 
-    // Fetch account details to get monthly income
+    // Fetch the account, this month's transactions and summary and the savings goals in one request
     useEffect(() => {
         if (!user) return;
-        const fetchAccount = async () => {
+        const fetchDashboard = async () => {
             try {
                 const token = localStorage.getItem('access_token');
                 if (!token) return;
 
-                const response = await fetch(`${apiUrl}api/account/`, {
+                const current = new Date();
+                const response = await fetch(`${apiUrl}api/dashboard/?date=${current.getMonth()}&year=${current.getFullYear()}`, {
                     method: 'GET',
                     headers: {
                         'Content-Type': 'application/json',
                         'Authorization': `Bearer ${token}`
                     }
                 });
-
-                if (response.ok) {
-                    const data = await response.json();
-                    setAccount(data);
-                }
+                if (!response.ok) throw new Error("Failed to fetch dashboard");
+                const data = await response.json();
+                setAccount(data.account);
+                summaryLoaded.current = true;
+                setTransactions(data.transactions);
+                setCategorySummary(data.summary.categories);
+                // Store all goal names for transaction checking (including completed/paused)
+                setSavingsGoals(data.savings_goals.filter(goal => goal.status === 'active'));
+                setAllSavingsGoalNames(data.savings_goals.map(goal => goal.name));
             } catch (err) {
-                console.error('Error fetching account:', err);
+                console.error('Error fetching dashboard:', err);
             } finally {
                 setLoadingAccount(false);
+                setLoadingTransactions(false);
+                setLoadingSavingsGoals(false);
             }
         };
-        fetchAccount();
+        fetchDashboard();
     }, [user]);
 
-    // Fetch transactions
+    // Refresh the per-category totals for the charts when the list changes afterwards
     useEffect(() => {
-        if (!user) return;
-        const fetchTransactions = async () => {
+        if (!user || loadingTransactions) return;
+        if (summaryLoaded.current) {
+            // The dashboard response already carried the summary for this list
+            summaryLoaded.current = false;
+            return;
+        }
+        const fetchSummary = async () => {
             try {
                 const current = new Date();
-                const res = await fetch(`${apiUrl}api/transactions/?user_id=${user.id}&date=${current.getMonth()}`);
-                if (!res.ok) throw new Error("Failed to fetch transactions");
+                const res = await fetch(`${apiUrl}api/transactions/summary/?user_id=${user.id}&date=${current.getMonth()}&year=${current.getFullYear()}`);
+                if (!res.ok) throw new Error("Failed to fetch transaction summary");
                 const data = await res.json();
-                console.log('Fetched transactions:', data); // Debug: check if savings_goal is in the response
-                setTransactions(data);
+                setCategorySummary(data.categories);
             } catch (err) {
                 console.error(err);
-            } finally {
-                setLoadingTransactions(false);
-            }
-        };
-        fetchTransactions();
-    }, [user]);
-
-    // Fetch savings goals for premium users
-    useEffect(() => {
-        if (!user || !account) return;
-        
-        const fetchSavingsGoals = async () => {
-            if (!account.is_premium) {
-                setLoadingSavingsGoals(false);
-                return;
-            }
-
-            try {
-                const token = localStorage.getItem('access_token');
-                const response = await fetch(`${apiUrl}api/savings-goals/`, {
-                    method: 'GET',
-                    headers: {
-                        'Content-Type': 'application/json',
-                        'Authorization': `Bearer ${token}`
-                    }
-                });
-
-                if (response.ok) {
-                    const data = await response.json();
-                    // Store all goals (not just active) to check transaction categories
-                    setSavingsGoals(data.filter(goal => goal.status === 'active'));
-                    // Also store all goal names for transaction checking (including completed/paused)
-                    setAllSavingsGoalNames(data.map(goal => goal.name));
-                }
-            } catch (err) {
-                console.error('Error fetching savings goals:', err);
-            } finally {
-                setLoadingSavingsGoals(false);
             }
         };
-        fetchSavingsGoals();
-    }, [user, account]);
+        fetchSummary();
+    }, [user, transactions, loadingTransactions]);
 
     // Helper function to check if transaction is from a savings goal
     const isSavingsGoalTransaction = (tx) => {
@@ -195,7 +170,7 @@ function Main() {
                 <p>Loading...</p>
             ) : (
                 <div>
-                    {transactions.length > 0 && <TransactionPieChart data={transactions} />}
+                    {categorySummary.length > 0 && <TransactionPieChart data={categorySummary} />}
                     
                     <table className="tx-table">
                         <tbody>
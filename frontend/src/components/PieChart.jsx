@@ -28,21 +28,10 @@ function TransactionPieChart({ data }) {
         return <div>No transaction data available for charts.</div>;
     }
 
-    const expenseTotals = data.filter(e => !e.is_income).reduce((acc, item) => {
-        const { category_name, amount } = item;
-        acc[category_name] = (acc[category_name] || 0) + amount;
-        return acc;
-    }, {});
+    // data is the per-category list from api/transactions/summary/
+    const expenseData = [["Category", "Amount"], ...data.filter(e => !e.is_income).map(e => [e.category_name, e.total])];
 
-    const expenseData = [["Category", "Amount"], ...Object.entries(expenseTotals)];
-
-    const incomeTotals = data.filter(e => e.is_income).reduce((acc, item) => {
-        const { category_name, amount } = item;
-        acc[category_name] = (acc[category_name] || 0) + amount;
-        return acc;
-    }, {});
-
-    const incomeData = [["Category", "Amount"], ...Object.entries(incomeTotals)];
+    const incomeData = [["Category", "Amount"], ...data.filter(e => e.is_income).map(e => [e.category_name, e.total])];
 
     // Theme-aware chart colors
 const chartColors = isDark